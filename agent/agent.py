@@ -1,11 +1,19 @@
+import asyncio
+import threading
+from typing import Any
 import sqlparse
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate 
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
-from langchain_core.output_parsers import StrOutputParser
+from sqlalchemy.exc import SQLAlchemyError
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableParallel, RunnableLambda
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain.agents import create_openai_tools_agent, AgentExecutor, create_sql_agent
-from database.db import get_schema, db
-from utils.prompt import SQL_PROMPT, SQL_RESPONSE_QUERY, POSTGRES_PROMPT, full_prompt
+from database.cache import is_select
+from database.db import get_engine, get_schema, get_db, arun_rows
+from database.results import QueryResult
+from utils.lazy import lazy
+from utils.prompt import SQL_REPAIR_PROMPT, POSTGRES_PROMPT, get_fast_sql_prompt, get_full_prompt
 
 def __parse_sql(inp):
     comps = inp.split("[SQL]")
@@ -14,37 +22,174 @@ def __parse_sql(inp):
         res = sqlparse.format(comps[-1], reindent=True)
     return res.replace("```sql", "").replace("```", "")
 
-def build_sql_chain(sql_llm, chat_model):
-    prompt = ChatPromptTemplate.from_template(SQL_PROMPT)
-
-    sql_response = (
-        RunnablePassthrough.assign(schema=get_schema)
-        | prompt
-        | sql_llm.bind(stop=["\nSQL Query:"])
-        | StrOutputParser()
-        | RunnableLambda(__parse_sql)
-    )
-
-    prompt_response = PromptTemplate.from_template(SQL_RESPONSE_QUERY)
-    full_chain = (
-        RunnablePassthrough.assign(query=sql_response).assign(
-            schema=get_schema,
-            response=lambda x: db.run(x["query"]),
-        )
-        | prompt_response
-        | chat_model
-        | StrOutputParser()
-    )
-
-    return full_chain
+# Generations that may repair a query that failed validation or execution, before the agent takes over.
+SQL_REPAIR_ATTEMPTS = 1
+# Rows the generated query is asked to return at most.
+SQL_TOP_K = 10
+# Characters of a database error shown to the repair generation.
+SQL_ERROR_CHARS = 500
+
+_sql_stats = {
+    "fast_requests": 0,
+    "fast_answered": 0,
+    "fast_llm_calls": 0,
+    "repairs": 0,
+    "fallbacks": 0,
+    "agent_requests": 0,
+    "agent_llm_calls": 0,
+}
+_sql_stats_lock = threading.Lock()
+
+def sql_mode_stats() -> dict:
+    """Requests and LLM calls of the single-shot SQL mode and of the SQL agent (alone or as fallback)."""
+    with _sql_stats_lock:
+        stats = dict(_sql_stats)
+    for mode in ("fast", "agent"):
+        requests = stats[f"{mode}_requests"]
+        stats[f"{mode}_llm_calls_per_request"] = stats[f"{mode}_llm_calls"] / requests if requests else None
+    return stats
+
+def reset_sql_mode_stats():
+    with _sql_stats_lock:
+        _sql_stats.update(dict.fromkeys(_sql_stats, 0))
+
+def _record(**counts: int):
+    with _sql_stats_lock:
+        for key, value in counts.items():
+            _sql_stats[key] += value
+
+class _AgentLLMCalls(BaseCallbackHandler):
+    def on_llm_start(self, *args: Any, **kwargs: Any):
+        _record(agent_llm_calls=1)
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any):
+        _record(agent_llm_calls=1)
+
+class InvalidSQL(ValueError):
+    """The generated text is not a single, well-formed SELECT statement."""
+
+def _validate_sql(query: str) -> str:
+    query = query.strip().rstrip(";").strip()
+    if not is_select(query):
+        raise InvalidSQL("expected exactly one SELECT statement")
+    depth = 0
+    for token in sqlparse.parse(query)[0].flatten():
+        if token.match(sqlparse.tokens.Punctuation, "("):
+            depth += 1
+        elif token.match(sqlparse.tokens.Punctuation, ")"):
+            depth -= 1
+        if depth < 0:
+            break
+    if depth:
+        raise InvalidSQL("unbalanced parentheses")
+    return query
+
+def _gave_up(text: str) -> bool:
+    return not text.strip() or "i do not know" in text.lower()
+
+def _repair_messages(query: str, error: Exception) -> list:
+    message = " ".join(str(error).split())[:SQL_ERROR_CHARS]
+    return [AIMessage(content=query), HumanMessage(content=SQL_REPAIR_PROMPT.format(error=message))]
+
+def _format_sql_result(query: str, result: QueryResult) -> str:
+    return f"SQL Query: {query}\nSQL Response:\n{result.to_prompt() or 'No data found'}"
+
+def _prompt_inputs(question: str) -> dict:
+    return {"question": question, "dialect": get_db().dialect, "top_k": SQL_TOP_K, "table_info": get_schema(None)}
+
+async def _arun_rows(query: str) -> QueryResult:
+    if get_engine().dialect.name == "postgresql":
+        return await arun_rows(query)
+    # The async engine is asyncpg-only; local stand-ins run on the sync pool.
+    return await asyncio.to_thread(get_db().run_rows, query)
+
+def count_sql_agent(agent: Runnable) -> RunnableLambda:
+    """The SQL agent with its requests and LLM calls recorded in sql_mode_stats(); returns its answer text."""
+    counted = agent.with_config(callbacks=[_AgentLLMCalls()])
+
+    def invoke(inputs: dict, config: RunnableConfig) -> str:
+        _record(agent_requests=1)
+        return counted.invoke(inputs, config)["output"]
+
+    async def ainvoke(inputs: dict, config: RunnableConfig) -> str:
+        _record(agent_requests=1)
+        return (await counted.ainvoke(inputs, config))["output"]
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="sql_agent")
+
+def build_sql_chain(sql_llm) -> RunnableLambda:
+    """
+    Single-shot text-to-SQL for SQLTool.
+
+    One generation with the few-shot examples, local validation with
+    sqlparse and execution; on a validation or database error, up to
+    SQL_REPAIR_ATTEMPTS generations see the error and try again. What still
+    fails, or what the model cannot answer, goes to the build_openai_sql
+    agent, which is only built then. Returns the query and its rows for the
+    calling agent to phrase.
+    """
+    fallback = lazy("sql_agent", lambda: count_sql_agent(build_openai_sql(sql_llm)))
+
+    def invoke(inputs: dict, config: RunnableConfig) -> str:
+        inputs = _prompt_inputs(inputs["question"])
+        prompt = get_fast_sql_prompt()
+        _record(fast_requests=1)
+        repair = []
+        for attempt in range(SQL_REPAIR_ATTEMPTS + 1):
+            _record(fast_llm_calls=1, repairs=int(attempt > 0))
+            generated = sql_llm.invoke(prompt.format_messages(**inputs, repair=repair), config)
+            query = __parse_sql(generated.content)
+            if _gave_up(query):
+                break
+            try:
+                query = _validate_sql(query)
+                result = get_db().run_rows(query)
+            except (InvalidSQL, SQLAlchemyError) as e:
+                repair = repair + _repair_messages(query, e)
+                continue
+            _record(fast_answered=1)
+            return _format_sql_result(query, result)
+        _record(fallbacks=1)
+        return fallback.get().invoke({"question": inputs["question"]}, config)
+
+    async def ainvoke(inputs: dict, config: RunnableConfig) -> str:
+        # Schema, example selection and the first build of the prompt are blocking work.
+        inputs = await asyncio.to_thread(_prompt_inputs, inputs["question"])
+        prompt = await asyncio.to_thread(get_fast_sql_prompt)
+        _record(fast_requests=1)
+        repair = []
+        for attempt in range(SQL_REPAIR_ATTEMPTS + 1):
+            _record(fast_llm_calls=1, repairs=int(attempt > 0))
+            messages = await asyncio.to_thread(prompt.format_messages, **inputs, repair=repair)
+            generated = await sql_llm.ainvoke(messages, config)
+            query = __parse_sql(generated.content)
+            if _gave_up(query):
+                break
+            try:
+                query = _validate_sql(query)
+                result = await _arun_rows(query)
+            except (InvalidSQL, SQLAlchemyError) as e:
+                repair = repair + _repair_messages(query, e)
+                continue
+            _record(fast_answered=1)
+            return _format_sql_result(query, result)
+        _record(fallbacks=1)
+        agent = fallback.get() if fallback.built else await asyncio.to_thread(fallback.get)
+        return await agent.ainvoke({"question": inputs["question"]}, config)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="fast_sql")
 
 def build_openai_sql(llm):
-    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-    context = toolkit.get_context()
+    toolkit = SQLDatabaseToolkit(db=get_db(), llm=llm)
+    # Same as toolkit.get_context(), but the table info comes from the shared schema cache.
+    context = {
+        "table_info": get_schema(None),
+        "table_names": ", ".join(get_db().get_usable_table_names()),
+    }
     tools = toolkit.get_tools()
     
     prompt = ChatPromptTemplate.from_template(POSTGRES_PROMPT)
-    prompt = full_prompt.partial(**context)    
+    prompt = get_full_prompt().partial(**context)    
     agent = create_openai_tools_agent(llm, tools, prompt)
     # agent = create_sql_agent(llm, toolkit=toolkit,agent_type="openai-tools")
     
@@ -0,0 +1,151 @@
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, Iterator, Optional
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.graph import CompiledGraph
+from database.db import table_version
+from tools.vector_db import documents_version
+from utils.semantic_cache import SemanticCache
+from agent.streaming import ANSWER_TAG, last_content
+
+CACHE_NODE = "cache"
+# A cache hit is checkpointed as if this node had ended the run.
+FINISH_NODE = "supervisor"
+
+def data_version() -> str:
+    """Changes whenever the anggota table or the document set changes."""
+    return f"{table_version()}:{documents_version()}"
+
+class CachedGraph:
+    """
+    Serves near-identical questions from a SemanticCache in front of a compiled graph.
+
+    On a hit, stream/astream yield a single update from the "cache" node holding
+    the stored final answer, in the same shape as the graph's own updates, and
+    invoke/ainvoke return it as the last message. Every other attribute is
+    delegated to the wrapped graph.
+
+    With a checkpointer, only the first question of a thread is looked up and
+    stored, since a follow-up depends on the conversation before it, and a hit
+    is written to the thread like any other turn.
+    """
+
+    def __init__(self, graph: CompiledGraph, cache: SemanticCache):
+        self.graph = graph
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    @staticmethod
+    def _question(input: Any) -> Optional[str]:
+        messages = input.get("messages") if isinstance(input, dict) else None
+        if messages and isinstance(messages[-1], HumanMessage):
+            return messages[-1].content
+        return None
+
+    @staticmethod
+    def _cached_message(answer: str) -> BaseMessage:
+        return HumanMessage(content=answer, name=CACHE_NODE)
+
+    def _checkpointed(self, config: Optional[RunnableConfig]) -> bool:
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        return thread_id is not None and getattr(self.graph, "checkpointer", None) is not None
+
+    def _cacheable_question(self, input: Any, config: Optional[RunnableConfig]) -> Optional[str]:
+        if self._checkpointed(config) and self.graph.get_state(config).values.get("messages"):
+            return None
+        return self._question(input)
+
+    async def _acacheable_question(self, input: Any, config: Optional[RunnableConfig]) -> Optional[str]:
+        if self._checkpointed(config) and (await self.graph.aget_state(config)).values.get("messages"):
+            return None
+        return self._question(input)
+
+    def _hit_state(self, input: Any, answer: str) -> dict:
+        return {"messages": list(input["messages"]) + [self._cached_message(answer)], "next": "FINISH"}
+
+    def _save_hit(self, input: Any, config: Optional[RunnableConfig], answer: str):
+        if self._checkpointed(config):
+            self.graph.update_state(config, self._hit_state(input, answer), as_node=FINISH_NODE)
+
+    async def _asave_hit(self, input: Any, config: Optional[RunnableConfig], answer: str):
+        if self._checkpointed(config):
+            await self.graph.aupdate_state(config, self._hit_state(input, answer), as_node=FINISH_NODE)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[dict]:
+        question = self._cacheable_question(input, config)
+        answer = self.cache.lookup(question) if question else None
+        if answer is not None:
+            self._save_hit(input, config, answer)
+            yield {CACHE_NODE: {"messages": [self._cached_message(answer)]}}
+            return
+        for chunk in self.graph.stream(input, config, **kwargs):
+            answer = last_content(chunk) or answer
+            yield chunk
+        if question and answer:
+            self.cache.store(question, answer)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[dict]:
+        question = await self._acacheable_question(input, config)
+        # The lookup embeds the question, keep that round trip off the event loop.
+        answer = await asyncio.to_thread(self.cache.lookup, question) if question else None
+        if answer is not None:
+            await self._asave_hit(input, config, answer)
+            yield {CACHE_NODE: {"messages": [self._cached_message(answer)]}}
+            return
+        async for chunk in self.graph.astream(input, config, **kwargs):
+            answer = last_content(chunk) or answer
+            yield chunk
+        if question and answer:
+            await asyncio.to_thread(self.cache.store, question, answer)
+
+    async def astream_events(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[dict]:
+        """On a hit, replays the cached answer as one answer-token event and one graph update event."""
+        question = await self._acacheable_question(input, config)
+        answer = await asyncio.to_thread(self.cache.lookup, question) if question else None
+        if answer is not None:
+            await self._asave_hit(input, config, answer)
+            run_id = str(uuid.uuid4())
+            output = {"messages": [self._cached_message(answer)]}
+            yield {
+                "event": "on_chat_model_stream", "name": CACHE_NODE, "run_id": run_id,
+                "tags": [ANSWER_TAG], "metadata": {"worker": CACHE_NODE},
+                "data": {"chunk": AIMessageChunk(content=answer)},
+            }
+            yield {
+                "event": "on_chain_stream", "name": CACHE_NODE, "run_id": run_id,
+                "tags": [], "metadata": {}, "data": {"chunk": {CACHE_NODE: output}},
+            }
+            return
+        root_run = None
+        async for event in self.graph.astream_events(input, config, **kwargs):
+            root_run = root_run or event["run_id"]
+            if event["event"] == "on_chain_stream" and event["run_id"] == root_run:
+                answer = last_content(event["data"]["chunk"]) or answer
+            yield event
+        if question and answer:
+            await asyncio.to_thread(self.cache.store, question, answer)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> dict:
+        question = self._cacheable_question(input, config)
+        answer = self.cache.lookup(question) if question else None
+        if answer is not None:
+            self._save_hit(input, config, answer)
+            return {"messages": list(input["messages"]) + [self._cached_message(answer)]}
+        output = self.graph.invoke(input, config, **kwargs)
+        if question and output.get("messages"):
+            self.cache.store(question, output["messages"][-1].content)
+        return output
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> dict:
+        question = await self._acacheable_question(input, config)
+        answer = await asyncio.to_thread(self.cache.lookup, question) if question else None
+        if answer is not None:
+            await self._asave_hit(input, config, answer)
+            return {"messages": list(input["messages"]) + [self._cached_message(answer)]}
+        output = await self.graph.ainvoke(input, config, **kwargs)
+        if question and output.get("messages"):
+            await asyncio.to_thread(self.cache.store, question, output["messages"][-1].content)
+        return output
@@ -1,30 +1,38 @@
+import asyncio
 import functools
-import operator
-from typing import Annotated, List, TypedDict
+from typing import Annotated, List, Optional, TypedDict, Union
 from tools.tools import build_utility_tools, build_rag_tools, build_search_tools
 from langchain_core.messages import BaseMessage, HumanMessage
-from agent.agent import build_openai_sql
-from agent.multi_agent import create_agent, create_team_supervisor, agent_node, agent_with_chain
+from agent.agent import build_openai_sql, build_sql_chain, count_sql_agent
+from agent.multi_agent import create_agent, create_team_supervisor, create_agent_node, agent_with_chain
+from agent.memory import compact_messages
+from database.checkpointer import LazyCheckpointSaver
 from tools.sql_tool import SQLTool
 from utils.prompt import TEAM_SUPERVISOR_PROMPT, TOP_SUPERVISOR_PROMPT
+from utils.lazy import LazyComponent, lazy
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import END, StateGraph
 from langgraph.graph.graph import CompiledGraph
 
+# The teams of the top-level graph; each is also the name of its lazy component.
+TEAMS = ["Research Team", "Data Team", "Summary Team", "General Team"]
+
 class ResearchTeamState(TypedDict):
 
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], compact_messages]
 
     team_members: List[str]
 
     next: str
 
 class DataTeamState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], compact_messages]
     team_members: List[str]
     next: str
         
 class SummaryTeamState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], compact_messages]
     team_members: List[str]
     next: str
 
@@ -34,6 +42,10 @@ def should_continue(state):
     
     if "FINISH" in last_message.content:
         return "FINISH"
+    elif isinstance(state["next"], list):
+        # Fan-out: every selected member runs in parallel; FINISH only counts on its own.
+        members = list(dict.fromkeys(n for n in state["next"] if n != "FINISH"))
+        return members or "FINISH"
     else:
         return state["next"]
 
@@ -46,7 +58,7 @@ def build_research_team(chat_model):
         "You are a research assistant who can search for valid info or data related to komunitas anggota domain"
          "Remember to pick a proper tool to use based on the tool's description.",
     )
-    search_node = functools.partial(agent_node, agent=search_agent, name="Search")
+    search_node = create_agent_node(search_agent, "Search")
 
     supervisor_agent = create_team_supervisor(
         chat_model,
@@ -80,10 +92,11 @@ def build_research_team(chat_model):
 
     return (functools.partial(enter_chain, members=research_graph.nodes) | chain)
 
-def build_data_team(sql_llm, chat_model):
+def build_data_team(sql_llm, chat_model, fast_sql: bool = True):
     util_tools = build_utility_tools(chat_model)
     
-    runnable_sql = build_openai_sql(sql_llm)
+    # The single-shot chain only falls back to the SQL agent when it cannot answer.
+    runnable_sql = build_sql_chain(sql_llm) if fast_sql else count_sql_agent(build_openai_sql(sql_llm))
     sql_tool = SQLTool(sql_chain=runnable_sql, handle_tool_error=True)
     sql_agent = create_agent(
         chat_model,
@@ -91,7 +104,7 @@ def build_data_team(sql_llm, chat_model):
         "You are an useful data assistant. You are responsible for requests of retrieving user or system data from the database by using provided tools."
         "\nYou will return the raw data.",
     )
-    sql_node = functools.partial(agent_node, agent=sql_agent, name="SQL")
+    sql_node = create_agent_node(sql_agent, "SQL")
     
     # Build agent for RAG with internal data
     retriever_tools = build_rag_tools(chat_model)
@@ -100,7 +113,7 @@ def build_data_team(sql_llm, chat_model):
         util_tools + retriever_tools,
         "You are a komunitas anggota assistant who can retrieve information from the embedding documents related to komunitas anggota information",
     )
-    retriever_node = functools.partial(agent_node, agent=retriever_agent, name="RAG")
+    retriever_node = create_agent_node(retriever_agent, "RAG")
 
     supervisor_agent = create_team_supervisor(
         chat_model,
@@ -149,7 +162,7 @@ def build_summary_team(llm):
         "The summary MUST include all received data."
         "Remember that if a summary about question of komunitas anggota is built, if the summary is good, give encourages to engage him to keep it up appended at the end of the summary. Otherwise, if it is not good, give advice to help him improve."
     )
-    summary_node = functools.partial(agent_node, agent=summary_agent, name="Summarization")
+    summary_node = create_agent_node(summary_agent, "Summarization")
     
     supervisor_agent = create_team_supervisor(
         llm,
@@ -189,7 +202,7 @@ def build_general_team(chat_model):
         build_utility_tools(chat_model),
         "You are a helpful assistant mainly focused on komunitas anggota domain. You are responsible for answering general questions.",
     )
-    general_node = functools.partial(agent_node, agent=general_agent, name="General")
+    general_node = create_agent_node(general_agent, "General")
 
     supervisor_agent = create_team_supervisor(
         chat_model,
@@ -224,9 +237,20 @@ def build_general_team(chat_model):
     return (functools.partial(enter_chain, members=general_graph.nodes) | chain)
 
 class State(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], compact_messages]
     next: str
 
+def collect_team_results(left: List[BaseMessage], right: Optional[List[BaseMessage]]) -> List[BaseMessage]:
+    """Accumulates team outputs of one fan-out step; a None update clears them."""
+    if right is None:
+        return []
+    return left + right
+
+class FanOutState(TypedDict):
+    messages: Annotated[List[BaseMessage], compact_messages]
+    next: Union[str, List[str]]
+    team_results: Annotated[List[BaseMessage], collect_team_results]
+
 
 def get_last_message(state: State) -> str:
     return state["messages"][-1].content
@@ -237,39 +261,97 @@ def join_graph(response: dict):
     print(f"Tracking join graph: {content}")
     return {"messages": content}
 
-def build_supervisor(sql_llm, chat_model, memory = None) -> CompiledGraph:
+def to_team_results(response: dict):
+    return {"team_results": response["messages"]}
+
+def merge_team_results(state: FanOutState):
+    """Folds the outputs of the teams that ran in parallel into a single message."""
+    results = state["team_results"]
+    if len(results) == 1:
+        message = results[0]
+    else:
+        message = HumanMessage(
+            content="\n\n".join(f"{result.name}: {result.content}" for result in results),
+            name="Teams",
+        )
+    return {"messages": [message], "team_results": None}
+
+def lazy_team(team: LazyComponent) -> RunnableLambda:
+    """Runs a team chain that is only built the first time the team is routed to."""
+    def invoke(message: str, config: RunnableConfig):
+        return team.get().invoke(message, config)
+
+    async def ainvoke(message: str, config: RunnableConfig):
+        # Building a team is blocking work, keep it off the event loop.
+        chain = team.get() if team.built else await asyncio.to_thread(team.get)
+        return await chain.ainvoke(message, config)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=team.name)
+
+def build_supervisor(
+    sql_llm,
+    chat_model,
+    memory = None,
+    fan_out: bool = False,
+    classifier = None,
+    fast_sql: bool = True,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
+) -> CompiledGraph:
+    """Builds the top-level graph.
+
+    With `fan_out`, the supervisor may select several teams at once; they run
+    concurrently and their answers are merged before the next supervisor step.
+    `classifier` (see agent.router) routes obvious questions without an LLM call.
+    `fast_sql` answers database questions with one generated query (see
+    agent.agent.build_sql_chain) instead of the nested SQL agent.
+    `memory` is a checkpointer, or a LazyComponent building one on first use.
+    `callbacks` (e.g. agent.instrumentation.GraphMetricsHandler) are attached to
+    every run of the graph.
+    """
+    teams = list(TEAMS)
     supervisor_node = create_team_supervisor(
         chat_model,
         TOP_SUPERVISOR_PROMPT,
-        ["Research Team", "Data Team", "Summary Team", "General Team"],
+        teams,
+        fan_out=fan_out,
+        classifier=classifier,
     )
 
-    super_graph = StateGraph(State)
+    super_graph = StateGraph(FanOutState if fan_out else State)
+    join = (RunnableLambda(join_graph) | to_team_results) if fan_out else join_graph
 
-    research_chain = build_research_team(chat_model)
-    super_graph.add_node("Research Team", get_last_message | research_chain | join_graph)
+    # Team subgraphs (and the tools and indexes behind them) are built on first
+    # routing rather than here; use utils.lazy.warm_up to pre-build them.
+    research_chain = lazy_team(lazy("Research Team", functools.partial(build_research_team, chat_model)))
+    super_graph.add_node("Research Team", get_last_message | research_chain | join)
 
-    data_chain = build_data_team(sql_llm, chat_model)
+    data_chain = lazy_team(lazy("Data Team", functools.partial(build_data_team, sql_llm, chat_model, fast_sql)))
     super_graph.add_node(
-        "Data Team", get_last_message | data_chain | join_graph
+        "Data Team", get_last_message | data_chain | join
     )
     
-    summary_chain = build_summary_team(chat_model)
+    summary_chain = lazy_team(lazy("Summary Team", functools.partial(build_summary_team, chat_model)))
     super_graph.add_node(
-        "Summary Team", get_last_message | summary_chain | join_graph
+        "Summary Team", get_last_message | summary_chain | join
     )
 
-    general_chain = build_general_team(chat_model)
+    general_chain = lazy_team(lazy("General Team", functools.partial(build_general_team, chat_model)))
     super_graph.add_node(
-        "General Team", get_last_message | general_chain | join_graph
+        "General Team", get_last_message | general_chain | join
     )
 
     super_graph.add_node("supervisor", supervisor_node)
 
-    super_graph.add_edge("Research Team", "supervisor")
-    super_graph.add_edge("Data Team", "supervisor")
-    super_graph.add_edge("Summary Team", "supervisor")    
-    super_graph.add_edge("General Team", "supervisor")
+    if fan_out:
+        super_graph.add_node("merge", merge_team_results)
+        for team in teams:
+            super_graph.add_edge(team, "merge")
+        super_graph.add_edge("merge", "supervisor")
+    else:
+        super_graph.add_edge("Research Team", "supervisor")
+        super_graph.add_edge("Data Team", "supervisor")
+        super_graph.add_edge("Summary Team", "supervisor")    
+        super_graph.add_edge("General Team", "supervisor")
     super_graph.add_conditional_edges(
         "supervisor",
         should_continue,
@@ -283,9 +365,15 @@ def build_supervisor(sql_llm, chat_model, memory = None) -> CompiledGraph:
     )
     super_graph.set_entry_point("supervisor")
 
+    if isinstance(memory, LazyComponent):
+        memory = LazyCheckpointSaver(memory)
     if memory:
         super_graph = super_graph.compile(checkpointer=memory)
     else:
         super_graph = super_graph.compile()
 
+    if callbacks:
+        # The binding forwards everything else (get_state, nodes, ...) to the compiled graph.
+        super_graph = super_graph.with_config(callbacks=callbacks)
+
     return super_graph
\ No newline at end of file
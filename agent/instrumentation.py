@@ -0,0 +1,287 @@
+import functools
+import json
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.outputs import LLMResult
+
+# Requests kept in memory for breakdown(); older ones are only in the JSONL trace.
+MAX_RECENT_REQUESTS = 100
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    """tiktoken's cl100k_base, or None when tiktoken or its vocabulary is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _is_graph_node(tags: Optional[List[str]]) -> bool:
+    """langgraph tags the run of every node with its step; internal writes are hidden."""
+    tags = tags or []
+    return any(tag.startswith("graph:step:") for tag in tags) and "langsmith:hidden" not in tags
+
+def _new_stats() -> dict:
+    return {
+        "wall_time": 0.0, "runs": 0, "llm_calls": 0, "llm_time": 0.0,
+        "prompt_tokens": 0, "completion_tokens": 0, "tool_calls": 0, "tool_time": 0.0,
+    }
+
+class _Span:
+    __slots__ = (
+        "run_id", "parent", "kind", "name", "key", "node", "root",
+        "start", "end", "prompt_tokens", "completion_tokens",
+    )
+
+    def __init__(self, run_id, parent, kind, name, key, node, root):
+        # `parent` is the nearest recorded ancestor: chains inside a node are not recorded.
+        self.run_id, self.parent, self.kind, self.name = run_id, parent, kind, name
+        self.key, self.node, self.root = key, node, root
+        self.start = time.perf_counter()
+        self.end = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def recorded(self) -> bool:
+        return self.node or self.kind != "chain" or self.run_id == self.root
+
+def _accumulate(stats: dict, span: _Span):
+    elapsed = span.end - span.start
+    if span.node:
+        stats["wall_time"] += elapsed
+        stats["runs"] += 1
+    elif span.kind == "llm":
+        stats["llm_calls"] += 1
+        stats["llm_time"] += elapsed
+        stats["prompt_tokens"] += span.prompt_tokens
+        stats["completion_tokens"] += span.completion_tokens
+    elif span.kind == "tool":
+        stats["tool_calls"] += 1
+        stats["tool_time"] += elapsed
+
+class GraphMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler recording where the time of a supervisor graph run goes.
+
+    Every run is attributed to a (team, node) pair: the top-level graph node
+    it runs under (a team, the supervisor or merge) and the innermost graph
+    node inside it, e.g. ("Data Team", "SQL"), or ("Data Team", "Data Team")
+    for the team node as a whole. Per pair it accumulates node wall time, LLM
+    calls and time, prompt/completion tokens and tool calls and time. Totals
+    are exported as Prometheus text, each finished request is optionally
+    appended to a JSONL trace and `breakdown()` renders a flame-style tree.
+
+    Token counts come from the provider when reported (streamed responses
+    report none), otherwise they are estimated with tiktoken.
+    """
+
+    run_inline = True
+
+    def __init__(self, trace_path: Optional[str] = None, max_recent: int = MAX_RECENT_REQUESTS):
+        self.trace_path = trace_path
+        self.max_recent = max_recent
+        self.totals: Dict[Tuple[str, str], dict] = defaultdict(_new_stats)
+        self.requests = 0
+        self.recent: "OrderedDict[str, dict]" = OrderedDict()
+        self._spans: Dict[UUID, _Span] = {}
+        self._finished: Dict[UUID, List[_Span]] = defaultdict(list)
+        self._request_ids: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    # --- span bookkeeping -------------------------------------------------
+
+    def _open(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str,
+              tags: Optional[List[str]] = None, metadata: Optional[dict] = None) -> _Span:
+        with self._lock:
+            parent = self._spans.get(parent_run_id)
+            if parent is None:
+                # Root run: one request, identified by its "request_id" metadata if given.
+                self._request_ids[run_id] = (metadata or {}).get("request_id", str(run_id))
+                span = _Span(run_id, None, kind, name, ("", ""), False, run_id)
+            else:
+                node = kind == "chain" and _is_graph_node(tags)
+                key = (parent.key[0] or name, name) if node else parent.key
+                anchor = parent.run_id if parent.recorded else parent.parent
+                span = _Span(run_id, anchor, kind, name, key, node, parent.root)
+            self._spans[run_id] = span
+            return span
+
+    def _close(self, run_id: UUID):
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+            if span is None:
+                return
+            span.end = time.perf_counter()
+            if span.key[0]:
+                _accumulate(self.totals[span.key], span)
+            if span.recorded:
+                self._finished[span.root].append(span)
+        if span.run_id == span.root:
+            self._finish_request(span)
+
+    def _finish_request(self, root: _Span):
+        with self._lock:
+            spans = self._finished.pop(root.run_id, [])
+            request_id = self._request_ids.pop(root.run_id)
+            self.requests += 1
+        nodes: Dict[str, dict] = defaultdict(_new_stats)
+        for span in spans:
+            if span.key[0]:
+                _accumulate(nodes[f"{span.key[0]}/{span.key[1]}"], span)
+        record = {
+            "request_id": request_id,
+            "duration": root.end - root.start,
+            "nodes": dict(nodes),
+            "spans": [
+                {
+                    "id": str(span.run_id),
+                    "parent": str(span.parent) if span.parent else None,
+                    "kind": span.kind,
+                    "name": span.name,
+                    "team": span.key[0],
+                    "node": span.key[1],
+                    "start": span.start - root.start,
+                    "duration": span.end - span.start,
+                    "tokens": span.prompt_tokens + span.completion_tokens,
+                }
+                for span in sorted(spans, key=lambda s: s.start)
+            ],
+        }
+        with self._lock:
+            self.recent[request_id] = record
+            while len(self.recent) > self.max_recent:
+                self.recent.popitem(last=False)
+            if self.trace_path:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # --- callbacks --------------------------------------------------------
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, tags: Optional[List[str]] = None,
+                       metadata: Optional[dict] = None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        self._open(run_id, parent_run_id, "chain", name, tags, metadata)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "llm"
+        span = self._open(run_id, parent_run_id, "llm", name)
+        span.prompt_tokens = sum(count_tokens(get_buffer_string(m)) for m in messages)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "llm"
+        span = self._open(run_id, parent_run_id, "llm", name)
+        span.prompt_tokens = sum(count_tokens(p) for p in prompts)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        span = self._spans.get(run_id)
+        if span is not None:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            if usage.get("completion_tokens"):
+                span.prompt_tokens = usage.get("prompt_tokens", span.prompt_tokens)
+                span.completion_tokens = usage["completion_tokens"]
+            else:
+                for generations in response.generations:
+                    for generation in generations:
+                        span.completion_tokens += count_tokens(generation.text)
+                        message = getattr(generation, "message", None)
+                        function_call = message.additional_kwargs.get("function_call") if message else None
+                        if function_call:
+                            span.completion_tokens += count_tokens(json.dumps(function_call))
+        self._close(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._open(run_id, parent_run_id, "tool", name)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    # --- exports ----------------------------------------------------------
+
+    def team_totals(self) -> Dict[str, dict]:
+        """Totals per top-level node; the wall time is that of the node itself."""
+        teams: Dict[str, dict] = defaultdict(_new_stats)
+        with self._lock:
+            for (team, node), stats in self.totals.items():
+                for name, value in stats.items():
+                    if name in ("wall_time", "runs") and node != team:
+                        continue
+                    teams[team][name] += value
+        return dict(teams)
+
+    def to_prometheus(self) -> str:
+        """All totals in the Prometheus text exposition format."""
+        with self._lock:
+            totals = {key: dict(stats) for key, stats in self.totals.items()}
+            lines = [
+                "# TYPE langgraph_requests_total counter",
+                f"langgraph_requests_total {self.requests}",
+            ]
+        for name in _new_stats():
+            metric = f"langgraph_node_{name}" + ("_seconds_total" if name.endswith("time") else "_total")
+            lines.append(f"# TYPE {metric} counter")
+            for (team, node), stats in sorted(totals.items()):
+                lines.append(f'{metric}{{team="{team}",node="{node}"}} {stats[name]}')
+        return "\n".join(lines) + "\n"
+
+    def breakdown(self, request_id: Optional[str] = None) -> str:
+        """
+        A flame-style breakdown of one finished request (the latest by default):
+        node, LLM and tool spans as an indented tree with their share of the request time.
+        """
+        with self._lock:
+            if not self.recent:
+                return ""
+            record = self.recent[request_id] if request_id else next(reversed(self.recent.values()))
+        children = defaultdict(list)
+        for span in record["spans"]:
+            children[span["parent"]].append(span)
+
+        total = record["duration"] or 1e-9
+        lines = [f"request {record['request_id']}: {record['duration']:.3f}s"]
+
+        def render(parent, depth):
+            for span in children.get(parent, []):
+                if span["parent"] is None:
+                    render(span["id"], depth)
+                    continue
+                label = span["name"] if span["kind"] == "chain" else f"{span['kind']}:{span['name']}"
+                tokens = f", {span['tokens']} tokens" if span["tokens"] else ""
+                bar = "#" * max(1, round(20 * span["duration"] / total))
+                lines.append(
+                    f"{'  ' * depth}{label:<{max(1, 40 - 2 * depth)}} {span['duration']:8.3f}s "
+                    f"{100 * span['duration'] / total:5.1f}% {bar}{tokens}"
+                )
+                render(span["id"], depth + 1)
+
+        render(None, 1)
+        return "\n".join(lines)
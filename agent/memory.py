@@ -0,0 +1,99 @@
+import threading
+from typing import Callable, List, Optional
+from langchain_core.messages import BaseMessage, SystemMessage
+from agent.instrumentation import count_tokens
+
+# Messages kept verbatim at the end of the history.
+MESSAGES_KEEP_LAST = 8
+# Token budget of the verbatim messages; older ones are folded even within MESSAGES_KEEP_LAST.
+MESSAGES_TOKEN_BUDGET = 3000
+# Token budget of the running summary; its oldest lines (except the first question) are dropped.
+SUMMARY_TOKEN_BUDGET = 600
+# Characters of a folded message kept in the summary.
+SUMMARY_LINE_CHARS = 300
+SUMMARY_NAME = "summary"
+SUMMARY_HEADER = "Ringkasan percakapan sebelumnya:"
+
+_stats = {"compactions": 0, "messages_folded": 0, "tokens_before": 0, "tokens_after": 0}
+_stats_lock = threading.Lock()
+
+def compaction_stats() -> dict:
+    """How often the history was compacted and how many tokens that took out of every later prompt."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return stats
+
+def reset_compaction_stats():
+    with _stats_lock:
+        _stats.update(compactions=0, messages_folded=0, tokens_before=0, tokens_after=0)
+
+def _tokens(message: BaseMessage) -> int:
+    return count_tokens(message.content) + 4
+
+def _is_summary(message: BaseMessage) -> bool:
+    return isinstance(message, SystemMessage) and message.name == SUMMARY_NAME
+
+def _summary_line(message: BaseMessage) -> str:
+    author = message.name or message.type
+    content = " ".join(str(message.content).split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS] + "..."
+    return f"- {author}: {content}"
+
+def _summarize(previous: Optional[BaseMessage], folded: List[BaseMessage], budget: int) -> SystemMessage:
+    lines = previous.content.split("\n")[1:] if previous else []
+    lines += [_summary_line(message) for message in folded]
+    # The first line is the opening question; past that the most recent lines win.
+    first, rest = lines[:1], lines[1:]
+    used = sum(count_tokens(line) for line in first)
+    kept = []
+    for line in reversed(rest):
+        used += count_tokens(line)
+        if used > budget:
+            break
+        kept.append(line)
+    return SystemMessage(content="\n".join([SUMMARY_HEADER] + first + kept[::-1]), name=SUMMARY_NAME)
+
+def message_reducer(
+    keep_last: int = MESSAGES_KEEP_LAST,
+    token_budget: int = MESSAGES_TOKEN_BUDGET,
+    summary_budget: int = SUMMARY_TOKEN_BUDGET,
+) -> Callable[[List[BaseMessage], List[BaseMessage]], List[BaseMessage]]:
+    """
+    A reducer for the messages channel that keeps the history bounded.
+
+    Appends like operator.add, then keeps the last `keep_last` messages (at
+    least the last one, at most `token_budget` tokens) verbatim and folds
+    everything older into a single running summary message at the start.
+    The summary is extractive (author and the start of each message), so
+    compaction never calls an LLM.
+    """
+
+    def reduce(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+        messages = left + right
+        summary = messages[0] if messages and _is_summary(messages[0]) else None
+        history = messages[1:] if summary else messages
+        if len(history) <= keep_last and sum(_tokens(m) for m in history) <= token_budget:
+            return messages
+
+        tail, used = [], 0
+        for message in reversed(history[-keep_last:]):
+            used += _tokens(message)
+            if tail and used > token_budget:
+                break
+            tail.append(message)
+        tail.reverse()
+        folded = history[: len(history) - len(tail)]
+        compacted = [_summarize(summary, folded, summary_budget)] + tail
+
+        with _stats_lock:
+            _stats["compactions"] += 1
+            _stats["messages_folded"] += len(folded)
+            _stats["tokens_before"] += sum(_tokens(m) for m in messages)
+            _stats["tokens_after"] += sum(_tokens(m) for m in compacted)
+        return compacted
+
+    return reduce
+
+compact_messages = message_reducer()
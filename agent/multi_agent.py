@@ -1,8 +1,13 @@
+import asyncio
+import functools
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 from langchain_core.messages.human import HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_openai import ChatOpenAI
+from agent.router import PreRouter, record_routing
+from agent.streaming import ANSWER_TAG
 
 def create_agent(
     llm: ChatOpenAI,
@@ -24,7 +29,8 @@ def create_agent(
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ]
     )
-    agent = create_openai_functions_agent(llm, tools, prompt)
+    # Tagged so that only worker answers (not routing or tool-internal LLM calls) are streamed to users.
+    agent = create_openai_functions_agent(llm.with_config(tags=[ANSWER_TAG]), tools, prompt)
     executor = AgentExecutor(agent=agent, tools=tools, return_intermediate_steps=True,
                                     verbose=True, handle_parsing_errors=True)
     return executor
@@ -36,10 +42,38 @@ def agent_node(state, agent, name):
     result = agent.invoke(state)
     return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
+async def aagent_node(state, agent, name):
+    result = await agent.ainvoke(state)
+    return {"messages": [HumanMessage(content=result["output"], name=name)]}
+
+def create_agent_node(agent, name) -> RunnableLambda:
+    """A graph node running the agent, natively async under ainvoke/astream."""
+    agent = agent.with_config(metadata={"worker": name})
+    return RunnableLambda(
+        functools.partial(agent_node, agent=agent, name=name),
+        afunc=functools.partial(aagent_node, agent=agent, name=name),
+        name=name,
+    )
+
 
-def create_team_supervisor(llm: ChatOpenAI, system_prompt, members) -> str:
-    """An LLM-based router."""
+def create_team_supervisor(llm: ChatOpenAI, system_prompt, members, fan_out: bool = False, classifier=None) -> str:
+    """An LLM-based router, behind a PreRouter that answers trivial decisions locally.
+
+    With `fan_out`, the router may also pick a list of members that then run in parallel.
+    `classifier` optionally maps an opening question to a member without an LLM call.
+    """
     options = ["FINISH"] + members
+    choices = [{"enum": options}]
+    instruction = (
+        "Given the conversation above, who should act next?"
+        " Or should we FINISH? Select one of: {options}"
+    )
+    if fan_out:
+        choices.append({"type": "array", "items": {"enum": members}})
+        instruction += (
+            ". If the request needs several of them and they can work independently,"
+            " select a list of all of them so they run at the same time."
+        )
     function_def = {
         "name": "route",
         "description": "Select the next role.",
@@ -49,9 +83,7 @@ def create_team_supervisor(llm: ChatOpenAI, system_prompt, members) -> str:
             "properties": {
                 "next": {
                     "title": "Next",
-                    "anyOf": [
-                        {"enum": options},
-                    ],
+                    "anyOf": choices,
                 },
             },
             "required": ["next"],
@@ -61,15 +93,29 @@ def create_team_supervisor(llm: ChatOpenAI, system_prompt, members) -> str:
         [
             ("system", system_prompt),
             MessagesPlaceholder(variable_name="messages"),
-            (
-                "system",
-                "Given the conversation above, who should act next?"
-                " Or should we FINISH? Select one of: {options}",
-            ),
+            ("system", instruction),
         ]
     ).partial(options=str(options), team_members=", ".join(members))
-    return (
+    llm_router = (
         prompt
         | llm.bind_functions(functions=[function_def], function_call="route")
         | JsonOutputFunctionsParser()
-    )
\ No newline at end of file
+    )
+    pre_router = PreRouter(members, classifier)
+
+    def route(state, config: RunnableConfig):
+        decision = pre_router.route(state)
+        record_routing(avoided=decision is not None)
+        if decision is not None:
+            return {"next": decision}
+        return llm_router.invoke(state, config)
+
+    async def aroute(state, config: RunnableConfig):
+        # The embedding classifier makes a blocking HTTP request; keep it off the event loop.
+        decision = await asyncio.to_thread(pre_router.route, state)
+        record_routing(avoided=decision is not None)
+        if decision is not None:
+            return {"next": decision}
+        return await llm_router.ainvoke(state, config)
+
+    return RunnableLambda(route, afunc=aroute, name="supervisor")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_stats = {"llm_calls": 0, "avoided": 0}
+_stats_lock = threading.Lock()
+
+def record_routing(avoided: bool):
+    with _stats_lock:
+        _stats["avoided" if avoided else "llm_calls"] += 1
+
+def routing_stats() -> dict:
+    """How many supervisor decisions went to the LLM and how many were avoided."""
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_routing_stats():
+    with _stats_lock:
+        _stats.update(llm_calls=0, avoided=0)
+
+class KeywordClassifier:
+    """Routes a question to the one member whose keyword patterns it matches."""
+
+    def __init__(self, rules: Dict[str, Sequence[str]]):
+        self.rules = {
+            member: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for member, patterns in rules.items()
+        }
+
+    def __call__(self, question: str) -> Optional[str]:
+        matches = [
+            member for member, patterns in self.rules.items()
+            if any(pattern.search(question) for pattern in patterns)
+        ]
+        # Ambiguous questions are left to the LLM.
+        return matches[0] if len(matches) == 1 else None
+
+class EmbeddingClassifier:
+    """Routes a question to the label of its nearest labelled example, if close enough."""
+
+    def __init__(self, embeddings: Embeddings, examples: Dict[str, Sequence[str]], threshold: float = 0.9):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.labels = [member for member, texts in examples.items() for _ in texts]
+        self.texts = [text for texts in examples.values() for text in texts]
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    self._matrix = self._normalize(self.embeddings.embed_documents(self.texts))
+        return self._matrix
+
+    def __call__(self, question: str) -> Optional[str]:
+        if not self.texts:
+            return None
+        scores = self._get_matrix() @ self._normalize(self.embeddings.embed_query(question))[0]
+        best = int(np.argmax(scores))
+        return self.labels[best] if scores[best] >= self.threshold else None
+
+class PreRouter:
+    """
+    Makes supervisor decisions that do not need an LLM.
+
+    A single-member team can only send the question to its member, or FINISH
+    once that member has answered. An optional classifier may route the
+    opening question of a multi-member supervisor. Anything else returns None
+    and is left to the LLM router.
+    """
+
+    def __init__(self, members: List[str], classifier: Optional[Callable[[str], Optional[str]]] = None):
+        self.members = members
+        self.classifier = classifier
+
+    def route(self, state: dict) -> Optional[str]:
+        messages = state["messages"]
+        answered = getattr(messages[-1], "name", None) is not None
+        if len(self.members) == 1:
+            return "FINISH" if answered else self.members[0]
+        if self.classifier and not answered:
+            member = self.classifier(messages[-1].content)
+            if member in self.members:
+                return member
+        return None
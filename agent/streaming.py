@@ -0,0 +1,97 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from utils.lazy import LazyComponent
+
+# Tag carried by the LLM of every worker agent. Only tokens of runs with this tag
+# reach the user: supervisor routing calls and LLMs used inside tools are skipped.
+ANSWER_TAG = "answer"
+
+def last_content(chunk: dict) -> Optional[str]:
+    """Content of the last message in a graph update, if the update carries messages."""
+    if "__end__" in chunk:
+        return None
+    item = next(iter(chunk.values()), None)
+    if isinstance(item, dict) and item.get("messages"):
+        return item["messages"][-1].content
+    return None
+
+async def astream_answer(graph, inputs: Any, config: Optional[dict] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams the answer tokens of a run of the supervisor graph.
+
+    With fan-out several agents answer at once and their tokens interleave,
+    so every token says whose answer it belongs to.
+
+    Yields:
+        ("start", worker) when an agent starts an answer; anything shown
+        earlier for the same worker was an intermediate answer.
+        ("token", (worker, text)) for every answer token.
+        ("done", {"answer", "time_to_first_token", "total_time"}) at the end.
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    # One buffer per LLM run, so concurrent answers do not mix.
+    answers: Dict[str, List[str]] = {}
+    last_run = None
+    final_answer = None
+    root_run = None
+    async for event in graph.astream_events(inputs, config, version="v1"):
+        root_run = root_run or event["run_id"]
+        if event["event"] == "on_chat_model_stream" and ANSWER_TAG in event.get("tags", []):
+            content = event["data"]["chunk"].content
+            if not content:
+                continue
+            worker = event.get("metadata", {}).get("worker", event["name"])
+            if event["run_id"] not in answers:
+                answers[event["run_id"]] = []
+                yield "start", worker
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            answers[event["run_id"]].append(content)
+            last_run = event["run_id"]
+            yield "token", (worker, content)
+        elif event["event"] == "on_chain_stream" and event["run_id"] == root_run:
+            final_answer = last_content(event["data"]["chunk"]) or final_answer
+
+    total = time.perf_counter() - start
+    yield "done", {
+        "answer": final_answer if final_answer is not None else "".join(answers.get(last_run, [])),
+        "time_to_first_token": (first_token_at - start) if first_token_at else None,
+        "total_time": total,
+    }
+
+def _start_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="stream-loop", daemon=True).start()
+    return loop
+
+# One loop for every synchronous caller: async resources such as the asyncpg
+# pool belong to the loop that opened them, so a loop per request cannot share them.
+_stream_loop = LazyComponent("stream_loop", _start_loop)
+
+def stream_answer(graph, inputs: Any, config: Optional[dict] = None) -> Iterator[Tuple[str, Any]]:
+    """Synchronous astream_answer for callers without an event loop, such as Streamlit."""
+    items: "queue.Queue" = queue.Queue()
+    finished = object()
+
+    async def produce():
+        try:
+            async for item in astream_answer(graph, inputs, config):
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+        finally:
+            items.put(finished)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), _stream_loop.get())
+    try:
+        while (item := items.get()) is not finished:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # The caller stopped reading (e.g. Streamlit reran the script); stop the run too.
+        future.cancel()
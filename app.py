@@ -1,5 +1,14 @@
 from langchain_openai import ChatOpenAI
-from agent.graph import build_supervisor
+import os
+from agent.graph import TEAMS, build_supervisor
+from agent.instrumentation import GraphMetricsHandler
+from agent.router import KeywordClassifier
+from agent.cached_graph import CachedGraph, data_version
+from database.checkpointer import build_checkpointer
+from utils.semantic_cache import SemanticCache
+from utils.embeddings import get_embeddings
+from utils.lazy import lazy, warm_up
+from utils.constants import ROUTING_KEYWORDS
 from dotenv import load_dotenv
 load_dotenv()
 OPENAI_MODEL = "gpt-3.5-turbo"
@@ -7,4 +16,25 @@ chat_model = ChatOpenAI(model=OPENAI_MODEL, max_tokens=512, temperature=0, strea
 
 sql_llm = ChatOpenAI(model="gpt-3.5-turbo", max_tokens=512, temperature=0, streaming=True)
 
-super_graph = build_supervisor(sql_llm, chat_model)
\ No newline at end of file
+# Let the supervisor send independent parts of a question to several teams at once.
+FAN_OUT = True
+
+# Per node/team latency, LLM calls and tokens; set GRAPH_TRACE_PATH for a JSONL trace per request.
+metrics = GraphMetricsHandler(trace_path=os.getenv("GRAPH_TRACE_PATH"))
+
+# Conversations are kept per configurable.thread_id, so every caller must pass one.
+# The database behind them is only connected to on the first request (or by warm_up()).
+memory = lazy("Checkpointer", build_checkpointer)
+
+# What the first request needs; streamlit.py pre-builds these, everything else stays lazy.
+WARM_UP_COMPONENTS = ["engine", "db", "Checkpointer", "embeddings", *TEAMS]
+
+# Cheap: teams, tools and indexes are only built on first use or by warm_up().
+super_graph = build_supervisor(
+    sql_llm, chat_model, memory=memory, fan_out=FAN_OUT, classifier=KeywordClassifier(ROUTING_KEYWORDS),
+    callbacks=[metrics],
+)
+
+# Near-identical questions are answered from the semantic cache until the data changes.
+answer_cache = SemanticCache(get_embeddings(), version=data_version)
+super_graph = CachedGraph(super_graph, answer_cache)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import asyncio
+import time
+import traceback
+import uuid
+from app import super_graph
+from langchain_core.messages.human import HumanMessage
+from utils.constants import prompt
+
+async def answer(question: str) -> str:
+    result = ""
+    async for s in super_graph.astream(
+        {
+            "messages": [
+                HumanMessage(
+                    content=question
+                )
+            ],
+        },
+        # One conversation per question; they must not share the checkpointed history.
+        {"recursion_limit": 50, "configurable": {"thread_id": str(uuid.uuid4())}},
+    ):
+        if "__end__" not in s:
+            item = next(iter(s.values()))
+            if "messages" in item:
+                result = item["messages"][-1].content
+    return result
+
+async def main():
+    # Every conversation shares one event loop instead of a thread each.
+    questions = [example["question"] for example in prompt]
+    start = time.time()
+    results = await asyncio.gather(*(answer(q) for q in questions), return_exceptions=True)
+    elapsed = time.time() - start
+    for question, result in zip(questions, results):
+        print(f"{question}\n-> {result}\n---")
+    print(f"{len(questions)} requests in {elapsed:.2f}s ({len(questions) / elapsed:.2f} req/s)")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"Exception: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
\ No newline at end of file
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+import threading
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    FunctionMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.constants import prompt
+
+# Worker tools the scripted agents call, in order of preference, before answering.
+WORKER_TOOLS = ["sql_query"]
+# Query the nested SQL agent runs for questions without a known example query.
+DEFAULT_QUERY = "SELECT COUNT(*) FROM anggota"
+
+_EXAMPLE_QUERIES = {example["question"].strip().lower(): example["query"] for example in prompt}
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model standing in for ChatOpenAI in benchmarks.
+
+    It answers the calls the graph makes the way a well-behaved model would:
+    routers pick a member by keyword (FINISH once a member has answered),
+    worker agents call the SQL tool once and report its output, and both the
+    single-shot SQL generation and the nested SQL agent use the example
+    query matching the question. Every
+    call waits `latency` seconds, plus `token_latency` per streamed token.
+    """
+
+    routes: Dict[str, Sequence[str]] = {}
+    latency: float = 0.0
+    token_latency: float = 0.0
+    calls: int = 0
+    lock: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_functions(self, functions, function_call=None, **kwargs: Any):
+        if function_call:
+            kwargs["function_call"] = {"name": function_call}
+        return self.bind(functions=functions, **kwargs)
+
+    # --- script -----------------------------------------------------------
+
+    def respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        with self.lock:
+            self.calls += 1
+        if kwargs.get("function_call"):
+            return self._route(messages, kwargs["functions"][0])
+        if kwargs.get("tools"):
+            return self._sql_agent(messages)
+        if kwargs.get("functions"):
+            return self._worker(messages, kwargs["functions"])
+        if messages and isinstance(messages[0], SystemMessage) and "SQL query:" in messages[0].content:
+            return self._sql_generation(messages)
+        return AIMessage(content=f"Jawaban untuk: {_question(messages)}")
+
+    def _route(self, messages: List[BaseMessage], function: dict) -> AIMessage:
+        members = [m for m in function["parameters"]["properties"]["next"]["anyOf"][0]["enum"] if m != "FINISH"]
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        if conversation and conversation[-1].name:
+            choice = "FINISH"
+        else:
+            question = _question(messages)
+            matches = [
+                member for member in members
+                if any(re.search(pattern, question, re.IGNORECASE) for pattern in self.routes.get(member, []))
+            ]
+            choice = matches[0] if matches else ("General Team" if "General Team" in members else members[0])
+        return _call_function("route", {"next": choice})
+
+    def _worker(self, messages: List[BaseMessage], functions: List[dict]) -> AIMessage:
+        results = [m for m in messages if isinstance(m, FunctionMessage)]
+        if results:
+            return AIMessage(content=f"Hasil: {results[-1].content}")
+        available = {function["name"] for function in functions}
+        for tool in WORKER_TOOLS:
+            if tool in available:
+                return _call_function(tool, {"question": _question(messages)})
+        return AIMessage(content=f"Jawaban untuk: {_question(messages)}")
+
+    def _sql_agent(self, messages: List[BaseMessage]) -> AIMessage:
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        if results:
+            return AIMessage(content=results[-1].content or "Tidak ada data.")
+        query = _EXAMPLE_QUERIES.get(_question(messages).strip().lower(), DEFAULT_QUERY)
+        call = {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": "sql_db_query", "arguments": json.dumps({"query": query})},
+        }
+        return AIMessage(content="", additional_kwargs={"tool_calls": [call]})
+
+    def _sql_generation(self, messages: List[BaseMessage]) -> AIMessage:
+        if len(messages) > 2:
+            # A repair turn: fall back to a query that always runs.
+            return AIMessage(content=DEFAULT_QUERY)
+        return AIMessage(content=_EXAMPLE_QUERIES.get(_question(messages).strip().lower(), DEFAULT_QUERY))
+
+    # --- BaseChatModel ----------------------------------------------------
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, **kwargs))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for chunk in _chunks(self.respond(messages, **kwargs)):
+            time.sleep(self.token_latency)
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for chunk in _chunks(self.respond(messages, **kwargs)):
+            await asyncio.sleep(self.token_latency)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+def _question(messages: List[BaseMessage]) -> str:
+    """The first human message: the question the current agent or router is working on."""
+    for message in messages:
+        if message.type == "human":
+            return message.content
+    return messages[-1].content if messages else ""
+
+def _call_function(name: str, arguments: dict) -> AIMessage:
+    return AIMessage(content="", additional_kwargs={"function_call": {"name": name, "arguments": json.dumps(arguments)}})
+
+def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+    if message.additional_kwargs:
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", additional_kwargs=message.additional_kwargs))
+        return
+    for token in re.findall(r"\S+\s*", message.content):
+        yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+class HashEmbeddings(Embeddings):
+    """
+    Local stub embedder: hashed bag of words, L2-normalised.
+
+    Texts sharing words get similar vectors, which is enough to exercise the
+    example selector, the vector store and the semantic cache offline.
+    """
+
+    model = "hash-embeddings"
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,221 @@
+"""
+Offline benchmark of the supervisor graph.
+
+Wires build_supervisor to scripted fake chat models, a seeded SQLite
+`anggota` table and a stub embedder, replays the example questions at a
+given concurrency and reports latency percentiles, throughput and LLM calls
+per request. Nothing leaves the machine, so it can run in CI:
+
+    python -m benchmark.run --requests 200 --concurrency 8 --latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import List
+import numpy as np
+
+TEAMS = ["Research Team", "Data Team", "Summary Team", "General Team"]
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="Questions to send, cycling through the question set.")
+    parser.add_argument("--turns", type=int, default=1, help="Questions per conversation (one checkpointed thread).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds every fake LLM call takes.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Extra seconds per streamed token.")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows in the synthetic anggota table.")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "anggota_benchmark.db"))
+    parser.add_argument(
+        "--checkpointer", choices=["memory", "sql"], default="memory",
+        help="Where multi-turn threads are checkpointed; sql uses a temporary SQLite file.",
+    )
+    parser.add_argument("--no-fan-out", dest="fan_out", action="store_false", help="Disable parallel teams.")
+    parser.add_argument("--no-fast-sql", dest="fast_sql", action="store_false", help="Use the nested SQL agent only.")
+    parser.add_argument("--no-classifier", dest="classifier", action="store_false", help="Route with the LLM only.")
+    parser.add_argument("--answer-cache", action="store_true", help="Put the semantic answer cache in front.")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' own output.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--max-p95", type=float, help="Exit with status 1 if p95 latency (s) is above this.")
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace):
+    """Points the app at the local stand-ins; must run before the app modules are imported."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["DB_SCHEMA"] = ""
+    os.environ["CHECKPOINT_SQLITE_PATH"] = os.path.join(tempfile.gettempdir(), f"benchmark_checkpoints_{os.getpid()}.db")
+    os.environ.pop("CHECKPOINT_DATABASE_URL", None)
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ["EXAMPLE_INDEX_PATH"] = os.path.join(tempfile.gettempdir(), "benchmark_example_index")
+    # Clients are constructed while building the teams but never called.
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("SERPER_API_KEY", "benchmark")
+
+def quiet(verbose: bool):
+    """The agents are verbose; keep their output out of the report unless asked for."""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+async def replay(graph, questions, requests: int, concurrency: int, turns: int = 1) -> list:
+    """Sends `requests` conversations of `turns` questions each; a turn's latency is one graph run."""
+    from langchain_core.messages import HumanMessage
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(first: int) -> List[dict]:
+        thread_id = str(uuid.uuid4())
+        results = []
+        async with semaphore:
+            for turn in range(turns):
+                request_id = f"{thread_id}:{turn}"
+                question = questions[(first + turn) % len(questions)]
+                start = time.perf_counter()
+                error = None
+                try:
+                    await graph.ainvoke(
+                        {"messages": [HumanMessage(content=question)]},
+                        {
+                            "recursion_limit": 50,
+                            "metadata": {"request_id": request_id},
+                            "configurable": {"thread_id": thread_id},
+                        },
+                    )
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                results.append({"request_id": request_id, "latency": time.perf_counter() - start, "error": error})
+        return results
+
+    conversations = await asyncio.gather(*(one(i * turns) for i in range(requests)))
+    return [result for conversation in conversations for result in conversation]
+
+def build_report(args, results, wall_time, metrics, startup) -> dict:
+    latencies = np.array([r["latency"] for r in results if r["error"] is None])
+    llm_calls, tokens, prompt_tokens = [], [], []
+    for r in results:
+        # Answers served by the answer cache never reach the graph and leave no record.
+        nodes = metrics.recent[r["request_id"]]["nodes"].values() if r["request_id"] in metrics.recent else []
+        llm_calls.append(sum(node["llm_calls"] for node in nodes))
+        tokens.append(sum(node["prompt_tokens"] + node["completion_tokens"] for node in nodes))
+        prompt_tokens.append(sum(node["prompt_tokens"] for node in nodes))
+    return {
+        "requests": len(results),
+        "errors": sum(r["error"] is not None for r in results),
+        "concurrency": args.concurrency,
+        "llm_latency": args.latency,
+        "startup_seconds": startup,
+        "wall_seconds": wall_time,
+        "throughput_rps": len(results) / wall_time if wall_time else 0.0,
+        "latency": {
+            name: float(np.percentile(latencies, q)) if latencies.size else None
+            for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+        "llm_calls_per_request": float(np.mean(llm_calls)) if llm_calls else None,
+        "tokens_per_request": float(np.mean(tokens)) if tokens else None,
+        "prompt_tokens_per_llm_call": sum(prompt_tokens) / sum(llm_calls) if sum(llm_calls) else None,
+        "teams": metrics.team_totals(),
+        "first_errors": [r["error"] for r in results if r["error"]][:3],
+    }
+
+def print_report(report: dict):
+    latency = report["latency"]
+    print(f"requests        {report['requests']} ({report['errors']} errors), concurrency {report['concurrency']}")
+    print(f"startup         {report['startup_seconds']:.2f}s")
+    print(f"throughput      {report['throughput_rps']:.2f} req/s over {report['wall_seconds']:.2f}s")
+    if latency["p50"] is not None:
+        print(
+            f"latency         p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  "
+            f"p99 {latency['p99']:.3f}s  max {latency['max']:.3f}s"
+        )
+    if report["llm_calls_per_request"] is not None:
+        print(f"llm calls/req   {report['llm_calls_per_request']:.2f}")
+        print(f"tokens/req      {report['tokens_per_request']:.0f}")
+    if report["prompt_tokens_per_llm_call"] is not None:
+        print(f"prompt tok/call {report['prompt_tokens_per_llm_call']:.0f}")
+    print(f"compaction      {report['compaction']}")
+    print(f"sql modes       {report['sql_modes']}")
+    for team, stats in sorted(report["teams"].items()):
+        print(
+            f"  {team:<16} runs {stats['runs']:>5}  wall {stats['wall_time']:8.2f}s  "
+            f"llm calls {stats['llm_calls']:>5}  tool time {stats['tool_time']:6.2f}s"
+        )
+    if "checkpointer" in report:
+        print(f"checkpointer    {report['checkpointer']}")
+    if "answer_cache" in report:
+        print(f"answer cache    {report['answer_cache']}")
+    for error in report["first_errors"]:
+        print(f"error: {error}")
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from agent.graph import build_supervisor
+    from agent.instrumentation import GraphMetricsHandler
+    from agent.memory import compaction_stats
+    from agent.agent import sql_mode_stats
+    from langgraph.checkpoint.memory import MemorySaver
+    from database.checkpointer import build_checkpointer
+    from agent.router import KeywordClassifier
+    from agent.cached_graph import CachedGraph, data_version
+    from database.db import get_engine
+    from utils.constants import ROUTING_KEYWORDS, prompt
+    from utils.embeddings import get_embeddings, set_embeddings
+    from utils.lazy import lazy, warm_up
+    from utils.semantic_cache import SemanticCache
+    from benchmark.fakes import HashEmbeddings, ScriptedChatModel
+    from benchmark.seed import seed_anggota
+
+    seed_anggota(get_engine(), rows=args.rows)
+    set_embeddings(HashEmbeddings())
+
+    model = ScriptedChatModel(routes=ROUTING_KEYWORDS, latency=args.latency, token_latency=args.token_latency)
+    metrics = GraphMetricsHandler(max_recent=args.requests * args.turns)
+    memory = None
+    if args.turns > 1:
+        # Built on first use, as in app.py.
+        memory = lazy("Checkpointer", build_checkpointer) if args.checkpointer == "sql" else MemorySaver()
+    graph = build_supervisor(
+        model,
+        model,
+        memory=memory,
+        fan_out=args.fan_out,
+        fast_sql=args.fast_sql,
+        classifier=KeywordClassifier(ROUTING_KEYWORDS) if args.classifier else None,
+        callbacks=[metrics],
+    )
+    if args.answer_cache:
+        graph = CachedGraph(graph, SemanticCache(get_embeddings(), version=data_version))
+
+    with quiet(args.verbose):
+        startup = sum(warm_up(TEAMS).values())
+    questions = [example["question"] for example in prompt]
+    start = time.perf_counter()
+    with quiet(args.verbose):
+        results = asyncio.run(replay(graph, questions, args.requests, args.concurrency, args.turns))
+    report = build_report(args, results, time.perf_counter() - start, metrics, startup)
+    report["compaction"] = compaction_stats()
+    report["sql_modes"] = sql_mode_stats()
+    if args.checkpointer == "sql" and memory is not None:
+        memory.get().close()
+        report["checkpointer"] = dict(memory.get().stats)
+        with contextlib.suppress(OSError):
+            os.remove(os.environ["CHECKPOINT_SQLITE_PATH"])
+    if args.answer_cache:
+        report["answer_cache"] = graph.cache.stats()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.max_p95 is not None and (report["latency"]["p95"] or 0) > args.max_p95:
+        print(f"p95 latency above {args.max_p95}s", file=sys.stderr)
+        return 1
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
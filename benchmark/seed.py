@@ -0,0 +1,56 @@
+import random
+from sqlalchemy import Engine, Float, Integer, MetaData, String, Table, Column
+from utils.constants import COLUMNS_DESCRIPTIONS
+
+INTEGER_COLUMNS = {"umur", "npsn", "sekolah_id", "is_aktif_sekolah", "is_aktif", "k_kota", "paspor_id"}
+FLOAT_COLUMNS = {"anggota_id", "nuptk", "nopes_ketua", "komunitas_id", "longitude", "latitude", "thn_sertifikasi"}
+
+KOTA = ["Kota Mojokerto", "Kab. Tulungagung", "Kab. Banyuwangi", "Kab. Pacitan", "Kota Surabaya", "Kab. Malang"]
+KECAMATAN = ["Bangorejo", "Dander", "Pesanggaran", "Kedungwaru", "Arjosari", "Lowokwaru"]
+KETUA = ["MOH. JURI", "SITI AMINAH", "BUDI SANTOSO", "SRI WAHYUNI", "AHMAD FAUZI"]
+NAMA = ["ISMIATI", "YULITA DEWI", "SUPRIYADI", "NUR HASANAH", "AGUS SALIM", "RINA MARLINA", "DWI LESTARI"]
+
+def _row(i: int, rng: random.Random) -> dict:
+    kota = rng.choice(KOTA)
+    values = {
+        "anggota_id": float(1_000_000 + i),
+        "nama_gtk": f"{rng.choice(NAMA)} {i}",
+        "nama_ketua": rng.choice(KETUA),
+        "kota": kota,
+        "domisili_kota_kabupaten": kota,
+        "kecamatan": rng.choice(KECAMATAN),
+        "domisili_kecamatan": f"Kec. {rng.choice(KECAMATAN)}",
+        "provinsi": "Jawa Timur",
+        "kelamin": rng.choice("PL"),
+        "umur": rng.randint(22, 60),
+        "is_negeri": rng.choice(["NEGERI", "SWASTA"]),
+        "status_sertifikasi": rng.choice(["Sudah", "Belum"]),
+        "status_keaktifan": rng.choice(["Aktif", "Tidak Aktif"]),
+        "status_aktif": rng.choice(["Aktif", "Tidak Aktif"]),
+        "status_perkawinan": rng.choice(["Kawin", "Belum Kawin", "Janda/Duda"]),
+        "jenjang": rng.choice(["SD", "SMP", "SMA", "SMK"]),
+        "jabatan_komunitas": rng.choice(["Anggota", "Ketua Komunitas", "Bendahara Komunitas"]),
+    }
+    for column in COLUMNS_DESCRIPTIONS:
+        if column not in values:
+            if column in INTEGER_COLUMNS:
+                values[column] = rng.randint(0, 99999)
+            elif column in FLOAT_COLUMNS:
+                values[column] = rng.random() * 1000
+            else:
+                values[column] = f"{column}-{rng.randint(0, 999)}"
+    return values
+
+def seed_anggota(engine: Engine, rows: int = 5000, seed: int = 0):
+    """(Re)creates a synthetic `anggota` table with every documented column and `rows` rows."""
+    metadata = MetaData()
+    columns = []
+    for name in COLUMNS_DESCRIPTIONS:
+        kind = Integer if name in INTEGER_COLUMNS else Float if name in FLOAT_COLUMNS else String
+        columns.append(Column(name, kind))
+    table = Table("anggota", metadata, *columns)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [_row(i, rng) for i in range(rows)])
@@ -0,0 +1,108 @@
+import time
+import threading
+from typing import Dict, Optional
+from sqlalchemy import text
+from database.db import DB_SCHEMA, get_engine
+
+AGGREGATES_REFRESH_INTERVAL = 900
+# Keep the grouped counts in a materialized view, refreshed by the scheduler, instead
+# of grouping the table on every refresh. Requires CREATE privileges on the schema.
+AGGREGATES_USE_MATERIALIZED_VIEW = False
+AGGREGATES_VIEW = "anggota_aggregates"
+
+# Column -> label used when the counts are handed to the agents.
+AGGREGATE_COLUMNS = {
+    "kelamin": "Jumlah anggota per jenis kelamin (P = Perempuan, L = Laki-laki)",
+    "kota": "Jumlah anggota per kota/kabupaten",
+    "is_negeri": "Jumlah anggota per status sekolah (NEGERI/SWASTA)",
+    "status_sertifikasi": "Jumlah anggota per status sertifikasi",
+    "status_keaktifan": "Jumlah anggota per status keaktifan",
+    "status_aktif": "Jumlah anggota per status aktif",
+}
+
+def _qualified(name: str) -> str:
+    return f"{DB_SCHEMA}.{name}" if DB_SCHEMA else name
+
+def grouped_counts_query() -> str:
+    """One statement computing the total and the counts per value of every AGGREGATE_COLUMNS column."""
+    table = _qualified("anggota")
+    parts = [f"SELECT 'total' AS dimension, NULL AS value, COUNT(*) AS total FROM {table}"]
+    for column in AGGREGATE_COLUMNS:
+        parts.append(
+            f"SELECT '{column}' AS dimension, CAST({column} AS TEXT) AS value, COUNT(*) AS total "
+            f"FROM {table} GROUP BY {column}"
+        )
+    return "\nUNION ALL\n".join(parts)
+
+class AggregateStore:
+    """
+    In-memory copy of the common "hard query" statistics.
+
+    The first `get()` loads them with a single grouped query (or from the
+    materialized view) and starts a background thread that refreshes them
+    every `refresh_interval` seconds, so later calls do no database work.
+    """
+
+    def __init__(self, refresh_interval: float = AGGREGATES_REFRESH_INTERVAL,
+                 use_materialized_view: bool = AGGREGATES_USE_MATERIALIZED_VIEW):
+        self.refresh_interval = refresh_interval
+        self.use_materialized_view = use_materialized_view
+        self.refreshed_at: Optional[float] = None
+        self._aggregates: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _load(self) -> Dict:
+        view = _qualified(AGGREGATES_VIEW)
+        with get_engine().begin() as connection:
+            if self.use_materialized_view:
+                connection.execute(text(
+                    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view} AS {grouped_counts_query()}"
+                ))
+                connection.execute(text(f"REFRESH MATERIALIZED VIEW {view}"))
+                rows = connection.execute(text(f"SELECT dimension, value, total FROM {view}")).fetchall()
+            else:
+                rows = connection.execute(text(grouped_counts_query())).fetchall()
+
+        aggregates = {"total": 0, **{column: {} for column in AGGREGATE_COLUMNS}}
+        for dimension, value, total in rows:
+            if dimension == "total":
+                aggregates["total"] = int(total)
+            else:
+                aggregates[dimension]["(kosong)" if value is None else value] = int(total)
+        return aggregates
+
+    def refresh(self) -> Dict:
+        aggregates = self._load()
+        with self._lock:
+            self._aggregates = aggregates
+            self.refreshed_at = time.time()
+        return aggregates
+
+    def _refresh_forever(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Refreshing aggregates failed: {e}")
+
+    def start_scheduler(self):
+        if self._scheduler is None or not self._scheduler.is_alive():
+            self._stop.clear()
+            self._scheduler = threading.Thread(target=self._refresh_forever, name="aggregates-refresh", daemon=True)
+            self._scheduler.start()
+
+    def stop_scheduler(self):
+        self._stop.set()
+
+    def get(self) -> Dict:
+        if self._aggregates is None:
+            with self._first_load_lock:
+                if self._aggregates is None:
+                    self.refresh()
+                    self.start_scheduler()
+        return self._aggregates
+
+aggregate_store = AggregateStore()
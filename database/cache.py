@@ -0,0 +1,111 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import sqlparse
+
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+QUERY_CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+
+def normalize_sql(query: str) -> str:
+    """Canonical text of a statement: no comments, upper-case keywords, single spaces, no trailing ';'."""
+    formatted = sqlparse.format(query, strip_comments=True, keyword_case="upper", strip_whitespace=True)
+    # Only whitespace between tokens is collapsed; string literals and quoted names keep theirs.
+    parts = []
+    for statement in sqlparse.parse(formatted):
+        for token in statement.flatten():
+            if not token.is_whitespace:
+                parts.append(token.value)
+            elif parts and parts[-1] != " ":
+                parts.append(" ")
+    return "".join(parts).strip().rstrip(";").strip()
+
+def is_select(query: str) -> bool:
+    statements = [s for s in sqlparse.parse(query) if s.token_first(skip_cm=True) is not None]
+    return len(statements) == 1 and statements[0].get_type() == "SELECT"
+
+def _size_of(value: Any) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    # Typed query results know their own size.
+    return getattr(value, "nbytes", None) or sys.getsizeof(value)
+
+class QueryCache:
+    """
+    Size-bounded LRU cache of query results with a TTL.
+
+    Tracks hits, misses and the database time saved by hits (the time the
+    original execution took, counted once per hit).
+    """
+
+    def __init__(
+        self,
+        ttl: float = QUERY_CACHE_TTL,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        max_entry_bytes: int = QUERY_CACHE_MAX_ENTRY_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.saved_seconds = 0.0
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[3]
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, elapsed: float):
+        size = _size_of(value)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic(), elapsed)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def skip(self):
+        """Records a statement that was not cacheable (not a SELECT)."""
+        with self._lock:
+            self.skipped += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+query_cache = QueryCache()
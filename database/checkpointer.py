@@ -0,0 +1,560 @@
+import os
+import time
+import zlib
+import atexit
+import asyncio
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.serde.jsonplus import JsonPlusSerializer
+from sqlalchemy import (
+    Column, Float, Integer, LargeBinary, MetaData, String, Table, create_engine, delete, func, select,
+)
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from utils.lazy import LazyComponent
+from utils.paths import cache_path, ensure_parent
+
+# Where checkpoints live: this URL, else the app database if it is Postgres, else CHECKPOINT_SQLITE_PATH.
+CHECKPOINT_DATABASE_URL = os.getenv("CHECKPOINT_DATABASE_URL")
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", cache_path("checkpoints.sqlite"))
+CHECKPOINT_SCHEMA = os.getenv("CHECKPOINT_SCHEMA") or None
+
+# Pending writes are flushed in one transaction every interval, or sooner once a batch is full.
+CHECKPOINT_FLUSH_INTERVAL = 0.5
+CHECKPOINT_BATCH_SIZE = 200
+# A list channel is stored as the messages appended since its previous version (or,
+# once compaction rewrites its head, as the new head plus the kept run), with a full copy every CHECKPOINT_SNAPSHOT_EVERY versions to bound the replay.
+CHECKPOINT_SNAPSHOT_EVERY = 20
+CHECKPOINT_COMPRESSION_LEVEL = 6
+# Pruning keeps the latest checkpoints of every thread and drops threads idle for too long.
+CHECKPOINT_KEEP_LAST = 10
+CHECKPOINT_MAX_AGE = 30 * 24 * 3600
+CHECKPOINT_PRUNE_INTERVAL = 600
+# Threads whose latest checkpoint (and delta bookkeeping) is kept in memory.
+CHECKPOINT_CACHED_THREADS = 1000
+
+FULL, APPEND, SPLICE = 0, 1, 2
+
+class CompressedSerializer(JsonPlusSerializer):
+    """langgraph's JSON serializer (messages included), zlib-compressed."""
+
+    def __init__(self, level: int = CHECKPOINT_COMPRESSION_LEVEL):
+        self.level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        return zlib.compress(super().dumps(obj), self.level)
+
+    def loads(self, data: bytes) -> Any:
+        return super().loads(zlib.decompress(data))
+
+def _tables(schema: Optional[str]) -> Tuple[MetaData, Table, Table]:
+    metadata = MetaData(schema=schema)
+    checkpoints = Table(
+        "graph_checkpoints", metadata,
+        Column("thread_id", String, primary_key=True),
+        Column("checkpoint_id", String, primary_key=True),
+        Column("parent_id", String),
+        # The checkpoint without its channel values, which are in graph_checkpoint_blobs.
+        Column("checkpoint", LargeBinary, nullable=False),
+        Column("metadata", LargeBinary),
+        Column("created_at", Float, nullable=False, index=True),
+    )
+    blobs = Table(
+        "graph_checkpoint_blobs", metadata,
+        Column("thread_id", String, primary_key=True),
+        Column("channel", String, primary_key=True),
+        Column("version", Integer, primary_key=True),
+        # FULL: the value; APPEND: the items appended to the value at base_version;
+        # SPLICE: [head, skip, items], the value is head + base[skip:] + items.
+        Column("kind", Integer, nullable=False),
+        Column("base_version", Integer),
+        Column("value", LargeBinary, nullable=False),
+    )
+    return metadata, checkpoints, blobs
+
+def _insert(table: Table, dialect: str, replace: bool):
+    """INSERT that replaces (`replace`) or skips rows whose primary key already exists."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy import insert
+
+        return insert(table)
+    statement = insert(table)
+    if not replace:
+        return statement.on_conflict_do_nothing()
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={column.name: statement.excluded[column.name] for column in table.columns if not column.primary_key},
+    )
+
+def _splice(previous: list, value: list) -> Optional[Tuple[list, int, list]]:
+    """
+    (head, skip, items) with value == head + previous[skip:] + items, keeping the
+    longest run of `previous`; None when that is not an append and the run
+    is not most of `value`.
+
+    A plain append is ([], 0, items). Compaction folds the oldest messages into
+    the summary at the start, which gives ([new summary], folded + 1, items).
+    """
+    if value[: len(previous)] == previous:
+        return [], 0, value[len(previous):]
+    for skip in range(len(previous)):
+        kept = previous[skip:]
+        if 2 * len(kept) <= len(value):
+            break
+        for start in range(len(value) - len(kept) + 1):
+            if value[start] == kept[0] and value[start : start + len(kept)] == kept:
+                return value[:start], skip, value[start + len(kept):]
+    return None
+
+class _Written:
+    """What was last stored for a channel of a thread, to decide between a delta and a full copy."""
+
+    __slots__ = ("version", "value", "deltas")
+
+    def __init__(self, version: int, value: Any, deltas: int):
+        self.version, self.value, self.deltas = version, value, deltas
+
+class SQLCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer on any SQLAlchemy database, built for many small graph steps.
+
+    - Writes are buffered and flushed in batches by a background thread, so
+      a graph step never waits on the database. The latest checkpoint of a
+      thread is kept in memory and served from there unless the database
+      has a newer one (one indexed lookup per read), so several processes
+      can share the tables; a checkpoint reaches the others once flushed.
+    - Channel values are stored per channel version, so a step only writes
+      the channels it changed; list channels (messages) store only what was
+      appended, or what compaction put in place of the dropped head, with a
+      periodic full copy.
+    - Values are JSON with zlib compression.
+    - `prune()` (also run periodically) keeps the latest CHECKPOINT_KEEP_LAST
+      checkpoints per thread and drops threads idle for CHECKPOINT_MAX_AGE.
+
+    Checkpoints put less than CHECKPOINT_FLUSH_INTERVAL before a crash can be
+    lost; `flush()` runs at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        schema: Optional[str] = CHECKPOINT_SCHEMA,
+        flush_interval: float = CHECKPOINT_FLUSH_INTERVAL,
+        batch_size: int = CHECKPOINT_BATCH_SIZE,
+        snapshot_every: int = CHECKPOINT_SNAPSHOT_EVERY,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        max_age: float = CHECKPOINT_MAX_AGE,
+        prune_interval: Optional[float] = CHECKPOINT_PRUNE_INTERVAL,
+    ):
+        super().__init__(serde=CompressedSerializer())
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self.keep_last = keep_last
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._metadata, self.checkpoints, self.blobs = _tables(schema)
+        self._metadata.create_all(engine)
+
+        self._pending_checkpoints: List[dict] = []
+        self._pending_blobs: List[dict] = []
+        self._latest: "OrderedDict[str, CheckpointTuple]" = OrderedDict()
+        self._written: "OrderedDict[str, Dict[str, _Written]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._last_prune = time.monotonic()
+        self.stats = {"puts": 0, "flushes": 0, "rows": 0, "bytes": 0, "pruned": 0, "stale_reads": 0}
+
+        self._thread = threading.Thread(target=self._run, name="checkpoint-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- writes -----------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        parent_id = config["configurable"].get("thread_ts")
+        saved = {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint["id"]}}
+        parent = {"configurable": {"thread_id": thread_id, "thread_ts": parent_id}} if parent_id else None
+
+        with self._lock:
+            written = self._written_channels(thread_id)
+            blob_rows = []
+            for channel, value in checkpoint["channel_values"].items():
+                version = checkpoint["channel_versions"].get(channel, 0)
+                previous = written.get(channel)
+                # A fork or update_state can store another value under a version already written.
+                if previous is not None and previous.version == version and previous.value == value:
+                    continue
+                row = self._blob_row(thread_id, channel, version, value, previous)
+                written[channel] = _Written(version, value, 0 if row["kind"] == FULL else previous.deltas + 1)
+                blob_rows.append(row)
+            header = {key: value for key, value in checkpoint.items() if key != "channel_values"}
+            self._pending_blobs.extend(blob_rows)
+            self._pending_checkpoints.append({
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint["id"],
+                "parent_id": parent_id,
+                "checkpoint": self.serde.dumps(header),
+                "metadata": self.serde.dumps(metadata),
+                "created_at": time.time(),
+            })
+            latest = self._latest.get(thread_id)
+            if latest is None or latest.checkpoint["id"] <= checkpoint["id"]:
+                self._set_latest(thread_id, CheckpointTuple(saved, checkpoint, metadata, parent))
+            self.stats["puts"] += 1
+            full = len(self._pending_checkpoints) >= self.batch_size
+        if full:
+            self._wake.set()
+        return saved
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        # Only serializes and buffers; the database write happens in the flusher thread.
+        return self.put(config, checkpoint, metadata)
+
+    def _blob_row(self, thread_id: str, channel: str, version: int, value: Any, previous: Optional[_Written]) -> dict:
+        row = {"thread_id": thread_id, "channel": channel, "version": version, "kind": FULL, "base_version": None}
+        splice = None
+        if (
+            previous is not None
+            and previous.version < version
+            and isinstance(value, list)
+            and isinstance(previous.value, list)
+            and previous.deltas + 1 < self.snapshot_every
+        ):
+            splice = _splice(previous.value, value)
+        if splice is not None:
+            head, skip, items = splice
+            row["base_version"] = previous.version
+            if not head and not skip:
+                row["kind"], value = APPEND, items
+            else:
+                row["kind"], value = SPLICE, [head, skip, items]
+        row["value"] = self.serde.dumps(value)
+        return row
+
+    # Per-thread in-memory state is kept for the most recently used threads; call with self._lock held.
+
+    def _written_channels(self, thread_id: str) -> Dict[str, _Written]:
+        if thread_id not in self._written:
+            self._written[thread_id] = {}
+            while len(self._written) > CHECKPOINT_CACHED_THREADS:
+                self._written.popitem(last=False)
+        self._written.move_to_end(thread_id)
+        return self._written[thread_id]
+
+    def _set_latest(self, thread_id: str, result: CheckpointTuple):
+        self._latest[thread_id] = result
+        self._latest.move_to_end(thread_id)
+        while len(self._latest) > CHECKPOINT_CACHED_THREADS:
+            self._latest.popitem(last=False)
+
+    def flush(self):
+        """Writes all buffered checkpoints in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                checkpoints, self._pending_checkpoints = self._pending_checkpoints, []
+                blobs, self._pending_blobs = self._pending_blobs, []
+            if not checkpoints and not blobs:
+                return
+            # The last value written under a channel version wins; Postgres refuses to upsert a row twice in one statement.
+            blobs = list({(row["thread_id"], row["channel"], row["version"]): row for row in blobs}.values())
+            dialect = self.engine.dialect.name
+            try:
+                with self.engine.begin() as connection:
+                    if blobs:
+                        connection.execute(_insert(self.blobs, dialect, replace=True), blobs)
+                    if checkpoints:
+                        connection.execute(_insert(self.checkpoints, dialect, replace=False), checkpoints)
+            except Exception:
+                # Put the batch back so that the next flush retries it.
+                with self._lock:
+                    self._pending_checkpoints[:0] = checkpoints
+                    self._pending_blobs[:0] = blobs
+                raise
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["rows"] += len(checkpoints) + len(blobs)
+                self.stats["bytes"] += sum(len(row["value"]) for row in blobs) + sum(
+                    len(row["checkpoint"]) + len(row["metadata"]) for row in checkpoints
+                )
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self.prune_interval and time.monotonic() - self._last_prune > self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception as e:
+                print(f"Checkpoint flush failed: {e}")
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+    # --- reads ------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_id = config["configurable"].get("thread_ts")
+        with self._lock:
+            latest = self._latest.get(thread_id)
+        if latest is not None and checkpoint_id == latest.checkpoint["id"]:
+            return latest
+        if latest is not None and checkpoint_id is None:
+            # Another process may have continued the thread since; its flushed checkpoints win.
+            if self._newest_stored(thread_id) <= latest.checkpoint["id"]:
+                return latest
+            with self._lock:
+                self.stats["stale_reads"] += 1
+        self.flush()
+        query = select(self.checkpoints).where(self.checkpoints.c.thread_id == thread_id)
+        if checkpoint_id:
+            query = query.where(self.checkpoints.c.checkpoint_id == checkpoint_id)
+        query = query.order_by(self.checkpoints.c.checkpoint_id.desc()).limit(1)
+        with self.engine.connect() as connection:
+            row = connection.execute(query).mappings().first()
+            if row is None:
+                return None
+            result = self._load(connection, row)
+        if checkpoint_id is None:
+            self._remember(thread_id, result)
+        return result
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = str(config["configurable"]["thread_id"])
+        with self._lock:
+            latest = self._latest.get(thread_id)
+        if latest is not None and config["configurable"].get("thread_ts") == latest.checkpoint["id"]:
+            return latest
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    def _newest_stored(self, thread_id: str) -> str:
+        with self.engine.connect() as connection:
+            newest = connection.execute(
+                select(func.max(self.checkpoints.c.checkpoint_id)).where(self.checkpoints.c.thread_id == thread_id)
+            ).scalar()
+        return newest or ""
+
+    def list(
+        self,
+        config: RunnableConfig,
+        *,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.flush()
+        query = select(self.checkpoints).where(self.checkpoints.c.thread_id == str(config["configurable"]["thread_id"]))
+        if before is not None:
+            query = query.where(self.checkpoints.c.checkpoint_id < before["configurable"]["thread_ts"])
+        query = query.order_by(self.checkpoints.c.checkpoint_id.desc())
+        if limit:
+            query = query.limit(limit)
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).mappings().all()
+            results = [self._load(connection, row) for row in rows]
+        yield from results
+
+    async def alist(
+        self,
+        config: RunnableConfig,
+        *,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for result in await asyncio.to_thread(lambda: list(self.list(config, before=before, limit=limit))):
+            yield result
+
+    def _load(self, connection, row) -> CheckpointTuple:
+        thread_id = row["thread_id"]
+        header = self.serde.loads(row["checkpoint"])
+        versions = header["channel_versions"]
+        values = {
+            channel: self._load_value(connection, thread_id, channel, version)
+            for channel, version in versions.items()
+        }
+        checkpoint = Checkpoint(
+            v=header["v"],
+            id=header["id"],
+            ts=header["ts"],
+            channel_values={channel: value for channel, value in values.items() if value is not _MISSING},
+            channel_versions=defaultdict(int, versions),
+            versions_seen=defaultdict(
+                lambda: defaultdict(int),
+                {node: defaultdict(int, seen) for node, seen in header["versions_seen"].items()},
+            ),
+        )
+        parent_id = row["parent_id"]
+        return CheckpointTuple(
+            {"configurable": {"thread_id": thread_id, "thread_ts": row["checkpoint_id"]}},
+            checkpoint,
+            self.serde.loads(row["metadata"]) if row["metadata"] is not None else {},
+            {"configurable": {"thread_id": thread_id, "thread_ts": parent_id}} if parent_id else None,
+        )
+
+    def _load_value(self, connection, thread_id: str, channel: str, version: int):
+        """Rebuilds a channel value from its latest full copy and the deltas after it."""
+        query = (
+            select(self.blobs.c.version, self.blobs.c.kind, self.blobs.c.base_version, self.blobs.c.value)
+            .where(self.blobs.c.thread_id == thread_id, self.blobs.c.channel == channel, self.blobs.c.version <= version)
+            .order_by(self.blobs.c.version.desc())
+            .limit(self.snapshot_every + 1)
+        )
+        chain = []
+        expected = version
+        for blob_version, kind, base_version, value in connection.execute(query):
+            if blob_version != expected:
+                continue
+            chain.append((kind, value))
+            if kind == FULL:
+                break
+            expected = base_version
+        else:
+            return _MISSING
+        result = self.serde.loads(chain.pop()[1])
+        for kind, delta in reversed(chain):
+            if kind == APPEND:
+                result = result + self.serde.loads(delta)
+            else:
+                head, skip, items = self.serde.loads(delta)
+                result = head + result[skip:] + items
+        return result
+
+    def _remember(self, thread_id: str, result: CheckpointTuple):
+        """Seeds the in-memory state of a thread loaded from the database, e.g. after a restart."""
+        with self._lock:
+            latest = self._latest.get(thread_id)
+            if latest is None or latest.checkpoint["id"] < result.checkpoint["id"]:
+                self._set_latest(thread_id, result)
+                written = self._written_channels(thread_id)
+                for channel, value in result.checkpoint["channel_values"].items():
+                    # Unknown delta depth after a reload: the next change is stored in full.
+                    written[channel] = _Written(
+                        result.checkpoint["channel_versions"][channel], value, self.snapshot_every
+                    )
+
+    # --- pruning ----------------------------------------------------------
+
+    def prune(self, keep_last: Optional[int] = None, max_age: Optional[float] = None) -> int:
+        """
+        Deletes old checkpoints and the channel values only they used.
+
+        Args:
+            keep_last: The number of latest checkpoints kept per thread.
+            max_age: Threads whose latest checkpoint is older (seconds) are deleted entirely.
+
+        Returns:
+            The number of checkpoints deleted.
+        """
+        keep_last = keep_last or self.keep_last
+        max_age = max_age or self.max_age
+        self.flush()
+        c, b = self.checkpoints, self.blobs
+        deleted = 0
+        with self.engine.begin() as connection:
+            idle = connection.execute(
+                select(c.c.thread_id).group_by(c.c.thread_id).having(func.max(c.c.created_at) < time.time() - max_age)
+            ).scalars().all()
+            for thread_id in idle:
+                deleted += connection.execute(delete(c).where(c.c.thread_id == thread_id)).rowcount
+                connection.execute(delete(b).where(b.c.thread_id == thread_id))
+            crowded = connection.execute(
+                select(c.c.thread_id).group_by(c.c.thread_id).having(func.count() > keep_last)
+            ).scalars().all()
+            for thread_id in crowded:
+                kept = connection.execute(
+                    select(c.c.checkpoint_id, c.c.checkpoint).where(c.c.thread_id == thread_id)
+                    .order_by(c.c.checkpoint_id.desc()).limit(keep_last)
+                ).all()
+                oldest = kept[-1].checkpoint_id
+                deleted += connection.execute(
+                    delete(c).where(c.c.thread_id == thread_id, c.c.checkpoint_id < oldest)
+                ).rowcount
+                # Per channel, values older than the full copy the oldest kept checkpoint builds on are unused.
+                needed: Dict[str, int] = {}
+                for _, header in kept:
+                    for channel, version in self.serde.loads(header)["channel_versions"].items():
+                        needed[channel] = min(needed.get(channel, version), version)
+                for channel, version in needed.items():
+                    base = connection.execute(
+                        select(func.max(b.c.version)).where(
+                            b.c.thread_id == thread_id, b.c.channel == channel, b.c.kind == FULL, b.c.version <= version,
+                        )
+                    ).scalar()
+                    if base is not None:
+                        connection.execute(
+                            delete(b).where(b.c.thread_id == thread_id, b.c.channel == channel, b.c.version < base)
+                        )
+        with self._lock:
+            self.stats["pruned"] += deleted
+            for thread_id in idle:
+                self._latest.pop(thread_id, None)
+                self._written.pop(thread_id, None)
+        return deleted
+
+_MISSING = object()
+
+class LazyCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer that builds the real one (e.g. lazy("Checkpointer", build_checkpointer))
+    on first use, so connecting to the database is not part of startup.
+    """
+
+    def __init__(self, component: LazyComponent):
+        super().__init__()
+        self.component = component
+
+    async def _aget(self) -> BaseCheckpointSaver:
+        # Building connects and creates tables, keep it off the event loop.
+        return self.component.get() if self.component.built else await asyncio.to_thread(self.component.get)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.component.get().get_tuple(config)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await (await self._aget()).aget_tuple(config)
+
+    def list(self, config: RunnableConfig, **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.component.get().list(config, **kwargs)
+
+    async def alist(self, config: RunnableConfig, **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for result in (await self._aget()).alist(config, **kwargs):
+            yield result
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        return self.component.get().put(config, checkpoint, metadata)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        return await (await self._aget()).aput(config, checkpoint, metadata)
+
+def build_checkpointer(**kwargs: Any) -> SQLCheckpointSaver:
+    """
+    The checkpointer for build_supervisor: on CHECKPOINT_DATABASE_URL if set,
+    else on the app's Postgres database, falling back to a local SQLite file
+    when that is not Postgres or cannot be reached.
+    """
+    if CHECKPOINT_DATABASE_URL:
+        return SQLCheckpointSaver(create_engine(CHECKPOINT_DATABASE_URL), **kwargs)
+    from database.db import get_engine, url
+
+    if make_url(url).get_backend_name() == "postgresql":
+        try:
+            return SQLCheckpointSaver(get_engine(), **kwargs)
+        except OperationalError as e:
+            print(f"Postgres unavailable for checkpoints, using {CHECKPOINT_SQLITE_PATH}: {e}")
+    engine = create_engine(f"sqlite:///{ensure_parent(CHECKPOINT_SQLITE_PATH)}")
+    return SQLCheckpointSaver(engine, **{"schema": None, **kwargs})
@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import time
+import threading
+import contextlib
+from typing import Optional
+import sqlparse
+from sqlparse import tokens as T
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+# Planner cost above which a generated query is not run (Postgres EXPLAIN units).
+SQL_GUARD_MAX_COST = float(os.getenv("SQL_GUARD_MAX_COST", 1_000_000))
+# Time limit of one generated query, below the pool-wide DB_STATEMENT_TIMEOUT_MS.
+SQL_GUARD_TIMEOUT_MS = int(os.getenv("SQL_GUARD_TIMEOUT_MS", 5000))
+# Instructions of the SQLite VM between two checks of the time limit.
+SQLITE_PROGRESS_STEPS = 10_000
+
+# Early, readable rejections; the read-only transaction of guarded() is what enforces it.
+_FORBIDDEN_FUNCTIONS = re.compile(
+    r"\b(pg_sleep\w*|pg_terminate_backend|pg_cancel_backend|pg_read_file|pg_read_binary_file|pg_ls_dir"
+    r"|lo_import|lo_export|dblink\w*|set_config|pg_reload_conf|load_extension)\s*\(",
+    re.IGNORECASE,
+)
+_ROW_LOCK = re.compile(r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+_stats = {"checked": 0, "limit_added": 0, "limit_capped": 0, "rejected": 0, "too_costly": 0, "timed_out": 0}
+_stats_lock = threading.Lock()
+
+def guard_stats() -> dict:
+    """How many generated statements were checked, rewritten with a LIMIT and rejected, by reason."""
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_guard_stats():
+    with _stats_lock:
+        _stats.update(dict.fromkeys(_stats, 0))
+
+def _record(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+class QueryRejected(SQLAlchemyError):
+    """A generated statement the guard refused to run; the message tells the agent why and what to change."""
+
+def _reject(reason: str, stat: str = "rejected") -> QueryRejected:
+    _record(stat)
+    return QueryRejected(f"Query rejected: {reason}")
+
+def _code_text(statement) -> str:
+    """The statement without string literals and comments, so their contents cannot trip the checks."""
+    return " ".join(
+        token.value for token in statement.flatten()
+        if token.ttype not in T.Literal.String and token.ttype not in T.Comment
+    )
+
+def _sql(statement) -> str:
+    """The statement without trailing comments and ';', so that a LIMIT can follow it."""
+    tokens = list(statement.flatten())
+    while tokens and (tokens[-1].is_whitespace or tokens[-1].ttype in T.Comment or tokens[-1].match(T.Punctuation, ";")):
+        tokens.pop()
+    return "".join(token.value for token in tokens).strip()
+
+def guard_sql(query: str, row_limit: int) -> str:
+    """
+    Checks a generated statement before it runs and caps its size.
+
+    Only a single, read-only SELECT (CTEs allowed) passes; a top-level LIMIT
+    above `row_limit` is lowered and a missing one is added.
+
+    Returns:
+        The statement to run.
+
+    Raises:
+        QueryRejected: for anything else.
+    """
+    _record("checked")
+    statements = [s for s in sqlparse.parse(query) if s.token_first(skip_cm=True) is not None]
+    if len(statements) != 1:
+        raise _reject("send exactly one SQL statement.")
+    statement = statements[0]
+    if statement.get_type() != "SELECT":
+        raise _reject("only read-only SELECT statements are allowed.")
+    for token in statement.flatten():
+        if (token.ttype in T.Keyword.DML and token.normalized != "SELECT") or token.ttype in T.Keyword.DDL:
+            raise _reject(f"{token.normalized} is not allowed; only read-only SELECT statements are.")
+    code = _code_text(statement)
+    if _ROW_LOCK.search(code):
+        raise _reject("row locks (FOR UPDATE/SHARE) are not allowed.")
+    if _FORBIDDEN_FUNCTIONS.search(code):
+        raise _reject(f"the function {_FORBIDDEN_FUNCTIONS.search(code).group(1)} is not allowed.")
+
+    top_level = [token for token in statement.tokens if not token.is_whitespace and token.ttype not in T.Comment]
+    while top_level and top_level[-1].match(T.Punctuation, ";"):
+        top_level.pop()
+    keywords = [token.normalized for token in top_level if token.ttype in T.Keyword]
+    if "INTO" in keywords:
+        raise _reject("SELECT ... INTO creates a table; only read-only SELECT statements are allowed.")
+    for i, token in enumerate(top_level):
+        if token.ttype in T.Keyword and token.normalized == "FETCH":
+            # FETCH FIRST|NEXT [n] ROW|ROWS ONLY, without n it is one row.
+            count = top_level[i + 2] if i + 2 < len(top_level) else None
+            if count is not None and count.ttype in T.Literal.Number.Integer:
+                if int(count.value) > row_limit:
+                    count.value = str(row_limit)
+                    _record("limit_capped")
+                return _sql(statement)
+            if count is not None and count.ttype in T.Keyword and count.normalized in ("ROW", "ROWS"):
+                return _sql(statement)
+            raise _reject("use FETCH FIRST with a plain number of rows.")
+    for i, token in enumerate(top_level):
+        if token.ttype in T.Keyword and token.normalized == "LIMIT":
+            value = top_level[i + 1] if i + 1 < len(top_level) else None
+            if value is not None and value.ttype in T.Literal.Number.Integer and int(value.value) <= row_limit:
+                return _sql(statement)
+            if value is not None and (value.ttype in T.Literal.Number.Integer or value.normalized == "ALL"):
+                value.value = str(row_limit)
+                _record("limit_capped")
+                return _sql(statement)
+            raise _reject("use LIMIT with a plain number of rows.")
+    _record("limit_added")
+    return f"{_sql(statement)}\nLIMIT {row_limit}"
+
+def _plan_cost(plan) -> float:
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return float(plan[0]["Plan"]["Total Cost"])
+
+def _too_costly(cost: float, max_cost: float) -> QueryRejected:
+    return _reject(
+        f"the estimated cost {cost:,.0f} is above the limit of {max_cost:,.0f}. Filter on more specific "
+        "columns, aggregate instead of listing rows, or avoid joins without a join condition.",
+        "too_costly",
+    )
+
+def _timed_out(timeout_ms: int) -> QueryRejected:
+    return _reject(
+        f"it ran longer than {timeout_ms} ms. Filter on more specific columns or aggregate instead of listing rows.",
+        "timed_out",
+    )
+
+def _is_timeout(error: DBAPIError) -> bool:
+    message = str(error.orig).lower()
+    return "statement timeout" in message or "interrupted" in message
+
+@contextlib.contextmanager
+def guarded(
+    connection: Connection,
+    query: str,
+    max_cost: float = SQL_GUARD_MAX_COST,
+    timeout_ms: int = SQL_GUARD_TIMEOUT_MS,
+    parameters: Optional[dict] = None,
+):
+    """
+    Runs the body under the guard's time limit, after checking the plan cost (Postgres only).
+
+    On Postgres the limit is a SET LOCAL statement_timeout in the current
+    transaction, which is also made read-only, so the database refuses side
+    effects the statement checks miss (e.g. SELECT setval(...)); on SQLite a
+    progress handler interrupts the statement. Timeouts are raised as
+    QueryRejected. Callers roll the transaction back rather than commit it.
+    """
+    dialect = connection.dialect.name
+    sqlite_connection = None
+    if dialect == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+        connection.exec_driver_sql("SET LOCAL transaction_read_only = on")
+        cost = _plan_cost(connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), parameters or {}).scalar())
+        if cost > max_cost:
+            raise _too_costly(cost, max_cost)
+    elif dialect == "sqlite":
+        deadline = time.monotonic() + timeout_ms / 1000
+        sqlite_connection = connection.connection.dbapi_connection
+        sqlite_connection.set_progress_handler(lambda: int(time.monotonic() > deadline), SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    except DBAPIError as e:
+        if _is_timeout(e):
+            raise _timed_out(timeout_ms) from e
+        raise
+    finally:
+        if sqlite_connection is not None:
+            sqlite_connection.set_progress_handler(None, 0)
+
+@contextlib.asynccontextmanager
+async def aguarded(
+    connection,
+    query: str,
+    max_cost: float = SQL_GUARD_MAX_COST,
+    timeout_ms: int = SQL_GUARD_TIMEOUT_MS,
+    parameters: Optional[dict] = None,
+):
+    """guarded() for an AsyncConnection on the asyncpg engine."""
+    await connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    await connection.exec_driver_sql("SET LOCAL transaction_read_only = on")
+    cost = _plan_cost((await connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), parameters or {})).scalar())
+    if cost > max_cost:
+        raise _too_costly(cost, max_cost)
+    try:
+        yield
+    except DBAPIError as e:
+        if _is_timeout(e):
+            raise _timed_out(timeout_ms) from e
+        raise
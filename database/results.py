@@ -0,0 +1,133 @@
+import contextlib
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from database.guard import aguarded, guarded
+
+RESULT_MAX_ROWS = 200
+RESULT_MAX_BYTES = 16 * 1024
+RESULT_FETCH_BATCH = 256
+RESULT_MAX_VALUE_LENGTH = 300
+
+@dataclass
+class QueryResult:
+    """Rows of a query as tuples, bounded by a row and a byte cap."""
+
+    columns: List[str]
+    rows: List[Tuple[Any, ...]] = field(default_factory=list)
+    nbytes: int = 0
+    truncated: bool = False
+
+    def scalars(self) -> list:
+        """All values, row by row, as a flat list."""
+        return [value for row in self.rows for value in row]
+
+    def to_prompt(self) -> str:
+        """Compact text for prompts: a header line, one line per row and a truncation note."""
+        if not self.rows and not self.truncated:
+            return ""
+        lines = [" | ".join(self.columns)]
+        lines.extend(" | ".join(_format_value(value) for value in row) for row in self.rows)
+        if self.truncated and not self.rows:
+            lines.append(
+                "... (truncated: the first row alone is over the size limit."
+                " Select fewer columns or aggregate.)"
+            )
+        elif self.truncated:
+            lines.append(
+                f"... (truncated: showing the first {len(self.rows)} rows; there are more."
+                " Refine the query with filters, aggregates or LIMIT.)"
+            )
+        return "\n".join(lines)
+
+def _format_value(value: Any) -> str:
+    value = "NULL" if value is None else str(value)
+    if len(value) > RESULT_MAX_VALUE_LENGTH:
+        value = value[:RESULT_MAX_VALUE_LENGTH] + "..."
+    return value
+
+def _row_size(row) -> int:
+    return sum(len(_format_value(value)) + 3 for value in row)
+
+class _Collector:
+    def __init__(self, columns: List[str], max_rows: int, max_bytes: int):
+        self.result = QueryResult(columns=columns)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def add(self, batch) -> bool:
+        """Adds a batch of rows; returns False once a cap is hit."""
+        result = self.result
+        for row in batch:
+            size = _row_size(row)
+            if len(result.rows) >= self.max_rows or result.nbytes + size > self.max_bytes:
+                result.truncated = True
+                return False
+            result.rows.append(tuple(row))
+            result.nbytes += size
+        return True
+
+def _prepare(connection: Connection, schema: Optional[str]):
+    if schema and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET search_path TO {schema}")
+
+def fetch_rows(
+    engine: Engine,
+    query: str,
+    schema: Optional[str] = None,
+    max_rows: int = RESULT_MAX_ROWS,
+    max_bytes: int = RESULT_MAX_BYTES,
+    batch_size: int = RESULT_FETCH_BATCH,
+    guard: bool = False,
+) -> QueryResult:
+    """
+    Runs a query with a server-side cursor and fetches it in batches until a cap is hit.
+
+    Args:
+        engine: The engine to run the query on.
+        query: The query to be executed.
+        schema: The search path to set first (Postgres only).
+        max_rows: The maximum number of rows kept.
+        max_bytes: The maximum size of the kept rows, as formatted for prompts.
+        batch_size: The number of rows fetched per round trip.
+        guard: Run under database.guard.guarded (plan cost check and time limit).
+
+    Returns:
+        A QueryResult; `truncated` is set when rows were left unread.
+    """
+    with engine.connect() as connection:
+        _prepare(connection, schema)
+        with guarded(connection, query) if guard else contextlib.nullcontext():
+            result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(text(query))
+            if not result.returns_rows:
+                connection.rollback()
+                return QueryResult(columns=[])
+            collector = _Collector(list(result.keys()), max_rows, max_bytes)
+            while batch := result.fetchmany(batch_size):
+                if not collector.add(batch):
+                    break
+            result.close()
+        # Reads only: nothing the statement did is kept.
+        connection.rollback()
+    return collector.result
+
+async def afetch_rows(
+    engine,
+    query: str,
+    max_rows: int = RESULT_MAX_ROWS,
+    max_bytes: int = RESULT_MAX_BYTES,
+    batch_size: int = RESULT_FETCH_BATCH,
+    guard: bool = False,
+) -> QueryResult:
+    """fetch_rows for an AsyncEngine; the search path comes from its connect args."""
+    async with engine.connect() as connection:
+        async with aguarded(connection, query) if guard else contextlib.nullcontext():
+            result = await connection.stream(text(query))
+            collector = _Collector(list(result.keys()), max_rows, max_bytes)
+            async for batch in result.partitions(batch_size):
+                if not collector.add(batch):
+                    break
+            await result.close()
+        await connection.rollback()
+    return collector.result
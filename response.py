@@ -1,30 +1,47 @@
 import time
 import traceback
-from app import super_graph
+import uuid
+from app import super_graph, metrics
 from langchain_core.messages.human import HumanMessage
+from agent.streaming import stream_answer
 # import langchain
 # langchain.debug = True
-start = time.time()
-try:
-    result = ""
-    for s in super_graph.stream(
-        {
-            "messages": [
-                HumanMessage(
-                    content="buat kesimpulan apa itu rendang!"
-                )
-            ],
-        },
-        {"recursion_limit": 50},
-    ):
-        if "__end__" not in s:
-            print(f"Receiving: {s}")
-            print("---")
-            item = next(iter(s.values()))
-            if "messages" in item:
-                result = item["messages"][-1].content
-    print("The final result: " + result)
-    print(time.time() - start)
-except Exception as e:
-    print(f"Exception: {e}")
-    print(f"Traceback: {traceback.format_exc()}")
\ No newline at end of file
+
+def main():
+    start = time.time()
+    try:
+        result = ""
+        current = None
+        for kind, value in stream_answer(
+            super_graph,
+            {
+                "messages": [
+                    HumanMessage(
+                        content="buat kesimpulan apa itu rendang!"
+                    )
+                ],
+            },
+            {"recursion_limit": 50, "configurable": {"thread_id": str(uuid.uuid4())}},
+        ):
+            if kind == "start":
+                print(f"\n--- {value} ---")
+            elif kind == "token":
+                worker, token = value
+                # Teams running at once interleave; mark where another agent's answer continues.
+                if worker != current:
+                    current = worker
+                    print(f"\n[{worker}] ", end="")
+                print(token, end="", flush=True)
+            elif kind == "done":
+                result = value["answer"]
+                print(f"\nTime to first token: {value['time_to_first_token']}")
+        print("The final result: " + result)
+        print(time.time() - start)
+        print(metrics.breakdown())
+    except Exception as e:
+        print(f"Exception: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+
+# Guarded: PDF ingest spawns worker processes, which re-import this module.
+if __name__ == "__main__":
+    main()
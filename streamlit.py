@@ -1,12 +1,40 @@
 import streamlit as st
 import time
+import threading
 import traceback
-from app import super_graph
+import uuid
+from app import super_graph, warm_up, metrics, WARM_UP_COMPONENTS
 from langchain_core.messages.human import HumanMessage
+from agent.streaming import stream_answer
 # import langchain
 # langchain.debug = True
+@st.cache_resource
+def start_warm_up():
+    """Pre-builds what the first request needs in the background once per server process."""
+    thread = threading.Thread(target=warm_up, args=(WARM_UP_COMPONENTS,), daemon=True)
+    thread.start()
+    return thread
+
+start_warm_up()
+
+def load_history(config: dict) -> list:
+    """Rebuilds the visible chat from the thread's checkpoint: each question with its final answer."""
+    history = []
+    for message in super_graph.get_state(config).values.get("messages", []):
+        if message.type == "human" and not message.name:
+            history.append({"user": message.content, "assistant": ""})
+        elif history and message.name and message.type != "system":
+            history[-1]["assistant"] = message.content
+    return history
+
+# The thread id lives in the URL, so a reload or a shared link resumes the same conversation.
+if 'thread_id' not in st.session_state:
+    st.session_state['thread_id'] = st.query_params.get("thread") or str(uuid.uuid4())
+    st.query_params["thread"] = st.session_state['thread_id']
+thread_config = {"configurable": {"thread_id": st.session_state['thread_id']}}
+
 if 'chat_history' not in st.session_state:
-    st.session_state['chat_history'] = []
+    st.session_state['chat_history'] = load_history(thread_config)
 
 def main():
     st.title('Chat')
@@ -14,9 +42,15 @@ def main():
     user_input = st.chat_input("Your message")
     if user_input:
         start = time.time()
+        request_id = str(uuid.uuid4())
         try:
             result = ""
-            for s in super_graph.stream(
+            # One block per answering agent: with fan-out, teams answer at the same time.
+            answers = st.empty()
+            board = answers.container()
+            blocks, texts = {}, {}
+            for kind, value in stream_answer(
+                super_graph,
                 {
                     "messages": [
                         HumanMessage(
@@ -24,16 +58,29 @@ def main():
                         )
                     ],
                 },
-                {"recursion_limit": 50},
+                {"recursion_limit": 50, "metadata": {"request_id": request_id}, **thread_config},
             ):
-                if "__end__" not in s:
-                    st.write(f"Receiving: {s}")
-                    st.write("---")
-                    item = next(iter(s.values()))
-                    if "messages" in item:
-                        result = item["messages"][-1].content
+                if kind == "start":
+                    # What was shown so far for this agent was an intermediate answer.
+                    if value not in blocks:
+                        blocks[value] = board.empty()
+                    texts[value] = ""
+                elif kind == "token":
+                    worker, token = value
+                    texts[worker] += token
+                    blocks[worker].markdown(texts[worker])
+                elif kind == "done":
+                    result = value["answer"]
+                    answers.empty()
+                    st.caption(
+                        f"Time to first token: {value['time_to_first_token'] or 0:.2f}s, "
+                        f"total: {value['total_time']:.2f}s"
+                    )
             st.session_state['chat_history'].append({"user": user_input, "assistant": result})
             st.write(time.time() - start)
+            if request_id in metrics.recent:
+                with st.expander("Latency breakdown"):
+                    st.text(metrics.breakdown(request_id))
         except Exception as e:
             st.write(f"Exception: {e}")
             st.write(f"Traceback: {traceback.format_exc()}")
@@ -0,0 +1,46 @@
+from collections import Counter
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from sqlalchemy import create_engine, select
+from agent.memory import compact_messages
+from database.checkpointer import APPEND, FULL, SPLICE, SQLCheckpointSaver, _splice
+
+def _saver(tmp_path) -> SQLCheckpointSaver:
+    engine = create_engine(f"sqlite:///{tmp_path / 'checkpoints.sqlite'}")
+    return SQLCheckpointSaver(engine, flush_interval=3600, prune_interval=None)
+
+def _checkpoint_turns(saver: SQLCheckpointSaver, turns: int) -> list:
+    """Puts one checkpoint per turn, the messages channel going through the compacting reducer."""
+    config = {"configurable": {"thread_id": "t1"}}
+    messages = []
+    for turn in range(1, turns + 1):
+        messages = compact_messages(messages, [
+            HumanMessage(content=f"berapa anggota komunitas tahun {2000 + turn}?"),
+            AIMessage(content=f"ada {turn * 10} anggota", name="Data Team"),
+        ])
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages}
+        checkpoint["channel_versions"] = {"messages": turn}
+        config = saver.put(config, checkpoint, {"step": turn})
+    saver.flush()
+    return messages
+
+def test_compacted_thread_is_stored_as_deltas(tmp_path):
+    saver = _saver(tmp_path)
+    messages = _checkpoint_turns(saver, 20)
+    with saver.engine.connect() as connection:
+        kinds = Counter(connection.execute(
+            select(saver.blobs.c.kind).where(saver.blobs.c.channel == "messages")
+        ).scalars())
+    # Only the first version is a full copy; rewriting the summary head is a splice, not a new copy.
+    assert kinds[FULL] == 1
+    assert kinds[APPEND] + kinds[SPLICE] == 19
+    assert kinds[SPLICE] > 0
+
+    restored = _saver(tmp_path).get_tuple({"configurable": {"thread_id": "t1"}})
+    assert restored.checkpoint["channel_values"]["messages"] == messages
+
+def test_splice():
+    assert _splice([1, 2], [1, 2, 3]) == ([], 0, [3])
+    assert _splice(["s", 1, 2, 3, 4], ["t", 2, 3, 4, 5]) == (["t"], 2, [5])
+    assert _splice([1, 2, 3], [4, 5, 6]) is None
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import pytest
+from sqlalchemy.exc import DBAPIError
+from database.guard import QueryRejected, aguarded, guard_sql, guard_stats, guarded, reset_guard_stats
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+class StubConnection:
+    """Records what the guard sends to a Postgres connection; EXPLAIN reports `cost`."""
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self, cost: float):
+        self.cost = cost
+        self.statements = []
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(str(statement))
+        return _Result(json.dumps([{"Plan": {"Total Cost": self.cost}}]))
+
+class AsyncStubConnection(StubConnection):
+    async def exec_driver_sql(self, statement):
+        super().exec_driver_sql(statement)
+
+    async def execute(self, statement, parameters=None):
+        return super().execute(statement, parameters)
+
+@pytest.fixture(autouse=True)
+def stats():
+    reset_guard_stats()
+    yield
+
+def test_cheap_plan_runs_read_only_with_timeout():
+    connection = StubConnection(cost=10)
+    ran = False
+    with guarded(connection, "SELECT 1", max_cost=100, timeout_ms=250):
+        ran = True
+    assert ran
+    assert connection.statements[:2] == ["SET LOCAL statement_timeout = 250", "SET LOCAL transaction_read_only = on"]
+    assert connection.statements[2] == "EXPLAIN (FORMAT JSON) SELECT 1"
+
+def test_costly_plan_is_rejected_before_running():
+    connection = StubConnection(cost=5_000)
+    with pytest.raises(QueryRejected, match="estimated cost 5,000"):
+        with guarded(connection, "SELECT * FROM a, b", max_cost=100):
+            pytest.fail("the body must not run")
+    assert guard_stats()["too_costly"] == 1
+
+def test_statement_timeout_is_reported_as_rejection():
+    connection = StubConnection(cost=1)
+    timeout = DBAPIError("SELECT 1", {}, Exception("canceling statement due to statement timeout"))
+    with pytest.raises(QueryRejected, match="ran longer than 250 ms"):
+        with guarded(connection, "SELECT 1", timeout_ms=250):
+            raise timeout
+    assert guard_stats()["timed_out"] == 1
+
+def test_async_costly_plan_is_rejected():
+    async def run():
+        async with aguarded(AsyncStubConnection(cost=5_000), "SELECT 1", max_cost=100):
+            pytest.fail("the body must not run")
+
+    with pytest.raises(QueryRejected):
+        asyncio.run(run())
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT nama FROM anggota; -- done", "SELECT nama FROM anggota\nLIMIT 201"),
+        ("SELECT nama FROM anggota LIMIT 1000", "SELECT nama FROM anggota LIMIT 201"),
+        ("SELECT nama FROM anggota LIMIT 5;", "SELECT nama FROM anggota LIMIT 5"),
+        ("SELECT nama FROM anggota FETCH FIRST 500 ROWS ONLY", "SELECT nama FROM anggota FETCH FIRST 201 ROWS ONLY"),
+        ("SELECT nama FROM anggota FETCH FIRST ROW ONLY", "SELECT nama FROM anggota FETCH FIRST ROW ONLY"),
+    ],
+)
+def test_row_cap(query, expected):
+    assert guard_sql(query, 201) == expected
+
+@pytest.mark.parametrize(
+    "query",
+    ["DELETE FROM anggota", "SELECT 1; SELECT 2", "SELECT pg_sleep(10)", "SELECT * FROM anggota FOR UPDATE"],
+)
+def test_rejected(query):
+    with pytest.raises(QueryRejected):
+        guard_sql(query, 200)
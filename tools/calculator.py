@@ -0,0 +1,192 @@
+import ast
+import math
+import operator
+import re
+import threading
+from typing import Any, Callable, Optional
+import numpy as np
+
+# Largest exponent and list a local expression may use; anything bigger goes to the LLM chain.
+MAX_EXPONENT = 1000
+MAX_VALUES = 100_000
+# Powers whose result would have more digits are refused rather than computed.
+MAX_RESULT_DIGITS = 1000
+# Significant digits of float answers.
+ANSWER_PRECISION = 12
+
+_BINARY = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {
+    "abs": np.abs,
+    "round": np.round,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "sum": np.sum,
+    "mean": np.mean,
+    "avg": np.mean,
+    "median": np.median,
+    "min": np.min,
+    "max": np.max,
+    "std": np.std,
+    "len": np.size,
+    "count": np.size,
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+_stats = {"local": 0, "fallback": 0}
+_stats_lock = threading.Lock()
+
+def calculator_stats() -> dict:
+    """How many calculations were answered locally and how many needed the LLM chain."""
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_calculator_stats():
+    with _stats_lock:
+        _stats.update(local=0, fallback=0)
+
+def _record(path: str):
+    with _stats_lock:
+        _stats[path] += 1
+
+class CalculatorError(ValueError):
+    """A valid expression without a usable answer (division by zero, overflow); the LLM chain would not do better."""
+
+def _digits(value: Any) -> float:
+    """Decimal digits of the largest absolute value; exact for the big ints Python computes."""
+    if isinstance(value, int):
+        return math.log10(abs(value)) if value else 0.0
+    return float(np.max(np.log10(np.maximum(np.abs(value), 1)), initial=0.0))
+
+def _normalize(expression: str) -> str:
+    expression = expression.strip().strip("`").strip()
+    expression = expression.replace("^", "**").replace("×", "*").replace("÷", "/")
+    # "15%" is a fraction, "a % b" stays a modulo.
+    return re.sub(r"(\d+(?:\.\d+)?)\s*%(?!\s*[\d(])", r"(\1/100)", expression)
+
+def _evaluate(node: ast.AST) -> Any:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.Tuple):
+        # "2,500 + 100" parses as the tuple (2, 500 + 100); only lists are vectors.
+        raise ValueError("bare comma-separated values")
+    if isinstance(node, ast.List):
+        if not node.elts:
+            raise CalculatorError("the list is empty")
+        if len(node.elts) > MAX_VALUES:
+            raise ValueError("too many values")
+        return np.array([_evaluate(element) for element in node.elts], dtype=float)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            if np.any(np.abs(right) > MAX_EXPONENT):
+                raise ValueError("exponent too large")
+            if _digits(left) * float(np.max(np.abs(right), initial=0.0)) > MAX_RESULT_DIGITS:
+                raise CalculatorError(f"the result has more than {MAX_RESULT_DIGITS} digits")
+        return _BINARY[type(node.op)](left, right)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        # A tuple is fine as the argument itself: sum((1, 2)).
+        args = [
+            _evaluate(ast.List(elts=arg.elts, ctx=ast.Load())) if isinstance(arg, ast.Tuple) else _evaluate(arg)
+            for arg in node.args
+        ]
+        if not args:
+            raise ValueError(f"{node.func.id}() needs an argument")
+        # sum(1, 2, 3) reads as sum([1, 2, 3]); round(x, 2) keeps its second argument.
+        if node.func.id != "round" and len(args) > 1:
+            args = [np.array(args, dtype=float)]
+        return _FUNCTIONS[node.func.id](*args)
+    raise ValueError(f"unsupported expression: {ast.dump(node)[:80]}")
+
+def _format(value: Any) -> str:
+    value = np.asarray(value)
+    if value.ndim:
+        return "[" + ", ".join(_format(v) for v in value.tolist()) + "]"
+    value = value.item()
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise CalculatorError("the result is not a finite number")
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.{ANSWER_PRECISION}g}"
+    return str(value)
+
+def evaluate(expression: str) -> str:
+    """
+    Evaluates an arithmetic expression locally, e.g. "sum([120, 75]) / 3" or "15% * 2000".
+
+    Only numbers, lists of numbers, pi/e, arithmetic operators and the
+    functions in _FUNCTIONS are allowed; lists are NumPy arrays, so
+    operators apply element-wise. Raises ValueError or SyntaxError for
+    anything else, CalculatorError if the expression has no usable answer.
+    """
+    tree = ast.parse(_normalize(expression), mode="eval")
+    with np.errstate(all="raise"):
+        try:
+            return _format(_evaluate(tree))
+        except ArithmeticError as e:
+            # Python's ZeroDivisionError and NumPy's FloatingPointError ("divide by zero encountered ...").
+            if isinstance(e, ZeroDivisionError) or "divide by zero" in str(e):
+                raise CalculatorError("division by zero") from e
+            # Python's OverflowError reads "(34, 'Numerical result out of range')".
+            if isinstance(e, OverflowError) or "overflow" in str(e):
+                raise CalculatorError("the result is too large") from e
+            raise CalculatorError(str(e)) from e
+        except TypeError as e:
+            raise ValueError(str(e)) from e
+
+def build_calculator(fallback: Callable[[str], str], afallback: Optional[Callable] = None):
+    """
+    The calculator tool's sync and async functions: evaluate() first, the
+    (LLM based) fallback only for input it cannot parse, such as word problems.
+    Expressions without an answer (division by zero) get an "Error: ..." reply.
+    """
+
+    def calculate(expression: str) -> str:
+        try:
+            answer = evaluate(expression)
+        except CalculatorError as e:
+            _record("local")
+            return f"Error: {e}"
+        except (SyntaxError, ValueError):
+            _record("fallback")
+            return fallback(expression)
+        _record("local")
+        return f"Answer: {answer}"
+
+    async def acalculate(expression: str) -> str:
+        try:
+            answer = evaluate(expression)
+        except CalculatorError as e:
+            _record("local")
+            return f"Error: {e}"
+        except (SyntaxError, ValueError):
+            _record("fallback")
+            return await afallback(expression) if afallback else fallback(expression)
+        _record("local")
+        return f"Answer: {answer}"
+
+    return calculate, acalculate
@@ -0,0 +1,31 @@
+import threading
+from typing import Callable, Dict, Hashable, List, Tuple
+from langchain_core.tools import BaseTool
+from utils.lazy import LazyComponent
+
+_tools: Dict[Tuple[Hashable, ...], LazyComponent] = {}
+_tools_lock = threading.Lock()
+
+def shared_tools(name: str, factory: Callable[[], List[BaseTool]], *key: Hashable) -> List[BaseTool]:
+    """
+    The tools `factory` builds for (name, *key), built once per process.
+
+    Concurrent first callers wait for a single build; every later caller gets
+    the same instances in a new list. Tools bound to a model pass id(model) as
+    key: the factory keeps the model alive, so the id is never reused.
+    """
+    with _tools_lock:
+        component = _tools.get((name, *key))
+        if component is None:
+            component = _tools[(name, *key)] = LazyComponent(name, factory)
+    return list(component.get())
+
+def tool_build_times() -> Dict[str, float]:
+    """Build time of every tool set built so far, by name."""
+    with _tools_lock:
+        components = list(_tools.values())
+    return {c.name: c.build_time for c in components if c.built}
+
+def reset_tools():
+    with _tools_lock:
+        _tools.clear()
@@ -0,0 +1,142 @@
+import os
+import threading
+from typing import Any, List
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from agent.instrumentation import count_tokens
+
+# Candidates fetched from the store before filtering, and chunks kept at most.
+RETRIEVAL_FETCH_K = 20
+RETRIEVAL_K = 4
+# Cosine similarity below which a chunk is not worth its tokens.
+RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", 0.7))
+# Cosine similarity above which two chunks count as the same text.
+RETRIEVAL_DUPLICATE_THRESHOLD = 0.97
+# 1 ranks by relevance only, 0 by diversity only.
+RETRIEVAL_MMR_LAMBDA = 0.6
+# Tokens of context handed to the answering prompt.
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", 1200))
+# A chunk is truncated into the remaining budget only if at least this many tokens are left.
+RETRIEVAL_MIN_PART_TOKENS = 100
+
+_stats = {
+    "searches": 0,
+    "candidates": 0,
+    "below_threshold": 0,
+    "duplicates": 0,
+    "used": 0,
+    "truncated": 0,
+    "retrieved_tokens": 0,
+    "used_tokens": 0,
+}
+_stats_lock = threading.Lock()
+
+def retrieval_stats() -> dict:
+    """Chunks and tokens retrieved versus handed to the prompt, summed over all searches."""
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_retrieval_stats():
+    with _stats_lock:
+        _stats.update(dict.fromkeys(_stats, 0))
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def _mmr(scores: np.ndarray, similarity: np.ndarray, k: int, weight: float) -> List[int]:
+    """Indexes of up to k candidates by maximal marginal relevance."""
+    selected = [int(np.argmax(scores))]
+    while len(selected) < min(k, len(scores)):
+        redundancy = similarity[:, selected].max(axis=1)
+        mmr = weight * scores - (1 - weight) * redundancy
+        mmr[selected] = -np.inf
+        selected.append(int(np.argmax(mmr)))
+    return selected
+
+def _truncate(text: str, tokens: int) -> str:
+    # Close enough for a budget: about four characters per token.
+    return text[: tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+class PackedRetriever(BaseRetriever):
+    """
+    Retriever over the Chroma store that only returns context worth its tokens.
+
+    Fetches `fetch_k` candidates, drops those below `score_threshold` and
+    near-duplicates of a better one, picks up to `k` by MMR and packs them,
+    best first, into `token_budget` tokens. Totals are in retrieval_stats().
+    """
+
+    vector_store: Any
+    k: int = RETRIEVAL_K
+    fetch_k: int = RETRIEVAL_FETCH_K
+    score_threshold: float = RETRIEVAL_SCORE_THRESHOLD
+    duplicate_threshold: float = RETRIEVAL_DUPLICATE_THRESHOLD
+    mmr_lambda: float = RETRIEVAL_MMR_LAMBDA
+    token_budget: int = RETRIEVAL_TOKEN_BUDGET
+
+    def _candidates(self, query: str):
+        query_vector = self.vector_store.embeddings.embed_query(query)
+        result = self.vector_store._collection.query(
+            query_embeddings=[query_vector],
+            n_results=self.fetch_k,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not result["documents"] or not result["documents"][0]:
+            # Nothing ingested yet.
+            return [], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.float32)
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(result["documents"][0], result["metadatas"][0])
+        ]
+        vectors = np.asarray(result["embeddings"][0], dtype=np.float32).reshape(len(documents), -1)
+        return documents, _normalize(vectors), _normalize(np.asarray(query_vector, dtype=np.float32))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        documents, vectors, query_vector = self._candidates(query)
+        if not documents:
+            with _stats_lock:
+                _stats["searches"] += 1
+            return []
+        stats = dict.fromkeys(_stats, 0)
+        stats["searches"] = 1
+        stats["candidates"] = len(documents)
+        # What the default top-k retriever would have stuffed into the prompt.
+        stats["retrieved_tokens"] = sum(count_tokens(d.page_content) for d in documents[: self.k])
+
+        scores = vectors @ query_vector
+        relevant = [i for i in np.argsort(-scores) if scores[i] >= self.score_threshold]
+        stats["below_threshold"] = len(documents) - len(relevant)
+
+        # Best first, so of two near-duplicates the more relevant one stays.
+        kept, seen = [], set()
+        for i in relevant:
+            text = " ".join(documents[i].page_content.split())
+            if text in seen or (kept and (vectors[kept] @ vectors[i]).max() >= self.duplicate_threshold):
+                stats["duplicates"] += 1
+                continue
+            seen.add(text)
+            kept.append(i)
+
+        packed, left = [], self.token_budget
+        if kept:
+            order = _mmr(scores[kept], vectors[kept] @ vectors[kept].T, self.k, self.mmr_lambda)
+            for i in (kept[j] for j in order):
+                document, tokens = documents[i], count_tokens(documents[i].page_content)
+                if tokens > left:
+                    if left < RETRIEVAL_MIN_PART_TOKENS:
+                        break
+                    document = Document(page_content=_truncate(document.page_content, left), metadata=document.metadata)
+                    tokens = count_tokens(document.page_content)
+                    stats["truncated"] += 1
+                packed.append(document)
+                left -= tokens
+                stats["used_tokens"] += tokens
+        stats["used"] = len(packed)
+
+        with _stats_lock:
+            for key, value in stats.items():
+                _stats[key] += value
+        return packed
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from langchain_community.utilities.google_serper import GoogleSerperAPIWrapper
+from utils.http import HTTP_TIMEOUT, get_session
+
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev")
+
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 2000))
+# SQLite file the cache survives restarts in; unset keeps it in memory only.
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH")
+
+def normalize_query(query: str) -> str:
+    """Case, width, spacing and surrounding punctuation do not change what Serper returns."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query).strip()
+    return query.strip(" \"'`.,;:!?")
+
+class SearchCache:
+    """
+    Size-bounded LRU cache of search results with a TTL.
+
+    Concurrent lookups of the same missing key are coalesced: one caller
+    fetches, the others wait for its result (or its exception, which is not
+    cached). With a `path`, entries are also written to a SQLite file and
+    the fresh ones are loaded back on start.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SEARCH_CACHE_TTL,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        path: Optional[str] = SEARCH_CACHE_PATH,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # Wall-clock times, so persisted entries expire across restarts.
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open(path)
+
+    @staticmethod
+    def key(*parts: Hashable) -> str:
+        return json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+
+    def _open(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS search_cache (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+        self._db.execute("DELETE FROM search_cache WHERE created < ?", (time.time() - self.ttl,))
+        rows = self._db.execute(
+            "SELECT key, value, created FROM search_cache ORDER BY created DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        for key, value, created in reversed(rows):
+            self._entries[key] = (json.loads(value), created)
+
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: str, value: Any):
+        created = time.time()
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), created),
+            )
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        del self._entries[key]
+        if self._db is not None:
+            self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._put(key, value)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+search_cache = SearchCache()
+
+class PooledSerperAPIWrapper(GoogleSerperAPIWrapper):
+    """
+    GoogleSerperAPIWrapper whose requests go through the shared, pooled HTTP
+    session and, when given a `cache`, are answered from it.
+    """
+
+    base_url: str = SERPER_URL
+    cache: Optional[SearchCache] = None
+
+    def _fetch(self, search_type: str, params: dict) -> dict:
+        headers = {
+            "X-API-KEY": self.serper_api_key or "",
+            "Content-Type": "application/json",
+        }
+        response = get_session().post(
+            f"{self.base_url}/{search_type}", headers=headers, params=params, timeout=HTTP_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _google_serper_api_results(self, search_term: str, search_type: str = "search", **kwargs: Any) -> dict:
+        params = {
+            "q": search_term,
+            **{key: value for key, value in kwargs.items() if value is not None},
+        }
+        if self.cache is None:
+            return self._fetch(search_type, params)
+        options = sorted((key, value) for key, value in params.items() if key != "q")
+        key = SearchCache.key(self.base_url, search_type, normalize_query(search_term), options)
+        return self.cache.get_or_fetch(key, lambda: self._fetch(search_type, params))
+
+    async def _async_google_serper_search_results(
+        self, search_term: str, search_type: str = "search", **kwargs: Any
+    ) -> dict:
+        return await asyncio.to_thread(self._google_serper_api_results, search_term, search_type, **kwargs)
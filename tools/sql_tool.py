@@ -1,7 +1,7 @@
 from typing import Any, Type, Optional
 from langchain.pydantic_v1 import BaseModel, Field
 from langchain.tools import BaseTool
-from langchain_core.runnables.base import RunnableSerializable
+from langchain_core.runnables import Runnable
 from langchain.callbacks.manager import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
@@ -15,7 +15,7 @@ class SQLTool(BaseTool):
     description = "useful for when you need to retrieve data from the database"
     args_schema: Type[BaseModel] = SQLInput
 
-    sql_chain: RunnableSerializable[Any, str]
+    sql_chain: Runnable[Any, str]
 
     def _run(
       self, question: str, run_manager: Optional[CallbackManagerForToolRun] = None
@@ -25,7 +25,8 @@ class SQLTool(BaseTool):
         return self.sql_chain.invoke({ "question": question })
 
     async def _arun(
-        self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+        self, question: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
     ) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError("sql_query does not support async")
\ No newline at end of file
+        print(f"Received question: {question}")
+        return await self.sql_chain.ainvoke({ "question": question })
\ No newline at end of file
@@ -1,21 +1,41 @@
+import asyncio
 from langchain.tools import Tool
 from datetime import datetime
 from langchain.chains.llm_math.base import LLMMathChain
-from langchain_community.utilities.google_serper import GoogleSerperAPIWrapper
 from langchain_community.tools.google_serper import GoogleSerperRun
 from tools.vector_db import load_chunk_persist_pdf
 from langchain.chains import RetrievalQA
 from utils.constants import COLUMNS_DESCRIPTIONS
-from database.db import db
+from database.aggregates import AGGREGATE_COLUMNS, aggregate_store
+from utils.lazy import lazy
+from tools.calculator import build_calculator
+from tools.retrieval import PackedRetriever
+from tools.registry import shared_tools
+from tools.search import PooledSerperAPIWrapper, search_cache
 from dotenv import load_dotenv
 load_dotenv()
-import json, ast
+import json
 
+# Every team asks for these; each set is built once per process (per model) and shared.
 def build_utility_tools(llm):
+    return shared_tools("utility_tools", lambda: _build_utility_tools(llm), id(llm))
+
+def build_search_tools():
+    return shared_tools("search_tools", _build_search_tools)
+
+def build_rag_tools(llm):
+    return shared_tools("rag_tools", lambda: _build_rag_tools(llm), id(llm))
+
+def _build_utility_tools(llm):
+    # Plain arithmetic is evaluated locally; only what that cannot parse costs an LLM call.
+    math_chain = LLMMathChain.from_llm(llm=llm, verbose=True)
+    calculate, acalculate = build_calculator(math_chain.run, math_chain.arun)
     calculator = Tool(
         name="calculator",
-        func=LLMMathChain.from_llm(llm=llm, verbose=True).run,
-        description="A tool for performing complex mathematics.",
+        func=calculate,
+        coroutine=acalculate,
+        description="A tool for performing complex mathematics. Input an arithmetic expression such as "
+        "sum([120, 75, 30]) / 3 or 45 / 1200 * 100; operations on lists apply to every value.",
     )
 
     dt = Tool(
@@ -25,7 +45,7 @@ def build_utility_tools(llm):
     )
     return [calculator, dt]
 
-def build_search_tools():
+def _build_search_tools():
     column_description_tool = Tool.from_function(
         name="column_description_search",
         func=get_columns_descriptions,
@@ -35,22 +55,38 @@ def build_search_tools():
     hard_query_tool = Tool(
         name="hard_query_search",
         func=get_hard_query,
-        description="A tool for fetching hard query like example GENDER MALE or FEMALE. Useful to get hard query. A json is returned."
+        description="A tool for fetching hard query like example GENDER MALE or FEMALE, members per city, school status (negeri/swasta), certification or activity status. Useful to get hard query. A json is returned."
     )
 
+    serper = GoogleSerperRun(api_wrapper=PooledSerperAPIWrapper(cache=search_cache))
     general_search = Tool(
         name="general_search",
-        func=GoogleSerperRun(api_wrapper=GoogleSerperAPIWrapper()).run,
+        func=serper.run,
+        coroutine=serper.arun,
         description="A tool for fetching general information using internet and google if needed. always return response in Indonesian Language"
     )
     return [column_description_tool, hard_query_tool, general_search]
 
-def build_rag_tools(llm):
+vector_store = lazy("vector_db", load_chunk_persist_pdf)
+# Registered so warm_up() can load the aggregates before the first statistics question.
+aggregate_loader = lazy("aggregates", aggregate_store.get)
+
+def _build_rag_tools(llm):
+    # The vector store is opened (and synced with the documents) on the first search.
+    qa_chain = lazy(
+        "documents_search",
+        lambda: RetrievalQA.from_chain_type(llm, chain_type="stuff", retriever=PackedRetriever(vector_store=vector_store.get())),
+    )
+
+    async def asearch(query: str) -> str:
+        # The first search opens the store and ingests new PDFs, keep that off the event loop.
+        chain = qa_chain.get() if qa_chain.built else await asyncio.to_thread(qa_chain.get)
+        return await chain.arun(query)
 
-    vector_db = load_chunk_persist_pdf()
     documents_search = Tool(
         name="documents_search",
-        func=RetrievalQA.from_chain_type(llm, chain_type="stuff", retriever=vector_db.as_retriever()).run,
+        func=lambda query: qa_chain.get().run(query),
+        coroutine=asearch,
         description="A tool for retrieving information from the internal documents. Use query as input. response with Indonesian language"
     )
 
@@ -73,26 +109,20 @@ def run_query_save_results(db, query):
     Returns:
         A list containing the results of the query.
     """
-    res = db.run(query)
-    res = [el for sub in ast.literal_eval(res) for el in sub]
-    return res
+    return db.run_rows(query).scalars()
 
 def get_hard_query(query: str) -> str:
-
-    kelamin_P = run_query_save_results(
-        db, "SELECT COUNT(*) FROM anggota WHERE kelamin = 'P';"
-    )
-    
-    kelamin_L = run_query_save_results(
-        db, "SELECT COUNT(*) FROM anggota WHERE kelamin = 'L';"
-    )
-    kelamin_P_str = (
-        "Jumlah total anggota berkelamin Perempuan : \n"
-        + json.dumps(kelamin_P, ensure_ascii=False)
-    )
-    kelamin_L_str = (
-        "Jumlah total anggota berkelamin Laki-laki : \n"
-        + json.dumps(kelamin_L, ensure_ascii=False)
-    )
-
-    return kelamin_P_str, kelamin_L_str
\ No newline at end of file
+    """
+    Serves the precomputed member statistics (gender, city, school status,
+    certification and activity counts) from memory as JSON.
+    """
+    aggregates = aggregate_store.get()
+    kelamin = aggregates["kelamin"]
+    results = {
+        "Jumlah total anggota": aggregates["total"],
+        "Jumlah total anggota berkelamin Perempuan": kelamin.get("P", 0),
+        "Jumlah total anggota berkelamin Laki-laki": kelamin.get("L", 0),
+    }
+    for column, label in AGGREGATE_COLUMNS.items():
+        results[label] = aggregates[column]
+    return json.dumps(results, ensure_ascii=False)
\ No newline at end of file
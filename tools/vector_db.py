@@ -1,28 +1,222 @@
 import os
+import json
+import time
+import hashlib
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+from utils.embeddings import get_embeddings
+from utils.paths import cache_path
 from langchain.text_splitter import CharacterTextSplitter
 
 DOCUMENTS_PATH = "./docs"
-VECTOR_STORE_PERSIST_PATH = "vector_data"
+VECTOR_STORE_PERSIST_PATH = os.getenv("VECTOR_STORE_PERSIST_PATH", cache_path("vector_data"))
+MANIFEST_PATH = os.path.join(VECTOR_STORE_PERSIST_PATH, "manifest.json")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+# Processes parsing and chunking PDFs; each runs at most two files ahead of the embedder.
+# They are spawned, not forked: the app forks from threads (warm-up, stream loop, pools).
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+# Chunks per embedding request and store write, and embedding requests in flight at once.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 128))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _chunk_ids(file: str, chunks) -> list:
+    """Content-addressed ids, so an unchanged chunk keeps its id across edits of the file."""
+    ids = []
+    occurrences = {}
+    for chunk in chunks:
+        n = occurrences.get(chunk.page_content, 0)
+        occurrences[chunk.page_content] = n + 1
+        key = f"{file}\0{n}\0{chunk.page_content}"
+        ids.append(hashlib.sha256(key.encode("utf-8")).hexdigest())
+    return ids
+
+def load_manifest() -> dict:
+    """
+    Reads the ingestion manifest kept next to the vector store.
+
+    Returns:
+        A dict with the splitter settings and, per PDF file, its content hash
+        and the ids of the chunks stored for it.
+    """
+    empty = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "files": {}}
+    if not os.path.exists(MANIFEST_PATH):
+        return empty
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        manifest = json.load(f)
+    # Different chunking means every stored chunk id is stale.
+    if (manifest.get("chunk_size"), manifest.get("chunk_overlap")) != (CHUNK_SIZE, CHUNK_OVERLAP):
+        manifest["files"] = {}
+    return manifest
+
+def save_manifest(manifest: dict):
+    os.makedirs(VECTOR_STORE_PERSIST_PATH, exist_ok=True)
+    manifest = dict(manifest, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def documents_version() -> str:
+    """A fingerprint of the ingested document set, changes whenever a PDF is added, edited or removed."""
+    files = load_manifest()["files"]
+    key = json.dumps({file: entry["hash"] for file, entry in files.items()}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _load_and_chunk(pdf_path: str) -> list:
+    """Parses and chunks one PDF; runs in a worker process, so it must stay at module level."""
+    text_splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return text_splitter.split_documents(PyPDFLoader(pdf_path).load())
+
+def _parse_all(paths: List[str], workers: int = INGEST_WORKERS) -> Iterator[Tuple[str, list]]:
+    """Yields (path, chunks) in order, with at most 2 * workers files parsed ahead of the consumer."""
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield path, _load_and_chunk(path)
+        return
+    remaining = iter(paths)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=context) as pool:
+        pending = deque((path, pool.submit(_load_and_chunk, path)) for path in itertools.islice(remaining, 2 * workers))
+        while pending:
+            path, future = pending.popleft()
+            for following in itertools.islice(remaining, 1):
+                pending.append((following, pool.submit(_load_and_chunk, following)))
+            yield path, future.result()
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+def _embed_and_write(vector_db: Chroma, batches: Iterable[list], concurrency: int = EMBED_CONCURRENCY) -> Iterator[list]:
+    """
+    Embeds batches of (file, id, chunk) with up to `concurrency` requests in
+    flight and writes each to the store in order; yields every written batch.
+    """
+    embeddings = get_embeddings()
+
+    def write(batch: list, vectors: list):
+        vector_db._collection.upsert(
+            ids=[chunk_id for _, chunk_id, _ in batch],
+            embeddings=vectors,
+            metadatas=[chunk.metadata for _, _, chunk in batch],
+            documents=[chunk.page_content for _, _, chunk in batch],
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed") as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(embeddings.embed_documents, [chunk.page_content for _, _, chunk in batch])))
+            if len(pending) >= concurrency:
+                batch, future = pending.popleft()
+                write(batch, future.result())
+                yield batch
+        while pending:
+            batch, future = pending.popleft()
+            write(batch, future.result())
+            yield batch
 
 def load_chunk_persist_pdf() -> Chroma:
-    documents = []
-    for file in os.listdir(DOCUMENTS_PATH):
-        if file.endswith('.pdf'):
-            pdf_path = os.path.join(DOCUMENTS_PATH, file)
-            loader = PyPDFLoader(pdf_path)
-            documents.extend(loader.load())
-
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    chunked_documents = text_splitter.split_documents(documents)
-
-    vector_db = Chroma.from_documents(
-        documents=chunked_documents,
-        embedding=OpenAIEmbeddings(),
+    """
+    Opens the persisted vector store and brings it in sync with DOCUMENTS_PATH.
+
+    Only PDFs whose content hash changed since the last run are parsed; for those,
+    new chunks are embedded and chunks that disappeared are deleted. Unchanged
+    PDFs and chunks are never re-embedded.
+
+    Ingest streams: PDFs are parsed in a process pool, their new chunks are
+    embedded in EMBED_BATCH_SIZE batches with bounded concurrency and written
+    batch by batch, so memory stays flat with the size of the corpus. A file
+    enters the manifest once all its chunks are written, so an interrupted
+    ingest resumes where it stopped.
+    """
+    vector_db = Chroma(
+        embedding_function=get_embeddings(),
         persist_directory=VECTOR_STORE_PERSIST_PATH
     )
-    vector_db.persist()
+    manifest = load_manifest()
+    files = manifest["files"]
+    if files and vector_db._collection.count() == 0:
+        # The store was wiped but the manifest survived; ingest from scratch.
+        files.clear()
+
+    changed = False
+    seen = set()
+    outdated = {}
+    for file in sorted(os.listdir(DOCUMENTS_PATH)):
+        if not file.endswith('.pdf'):
+            continue
+        seen.add(file)
+        pdf_path = os.path.join(DOCUMENTS_PATH, file)
+        file_hash = _hash_file(pdf_path)
+        entry = files.get(file)
+        if entry and entry["hash"] == file_hash:
+            continue
+        outdated[pdf_path] = (file, file_hash, entry)
+
+    for file in set(files).difference(seen):
+        if files[file]["chunks"]:
+            vector_db.delete(ids=files[file]["chunks"])
+        del files[file]
+        changed = True
+
+    # Files whose new chunks are not all written yet: file -> (manifest entry, chunks left).
+    unwritten = {}
+    start = time.perf_counter()
+    chunks_written = 0
+
+    def new_chunks() -> Iterator[tuple]:
+        nonlocal changed
+        for pdf_path, chunks in _parse_all(list(outdated)):
+            file, file_hash, entry = outdated[pdf_path]
+            ids = _chunk_ids(file, chunks)
+            old_ids = set(entry["chunks"]) if entry else set()
+            stale = old_ids.difference(ids)
+            if stale:
+                vector_db.delete(ids=list(stale))
+            new = [(file, chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id not in old_ids]
+            changed = True
+            if new:
+                unwritten[file] = ({"hash": file_hash, "chunks": ids}, len(new))
+                yield from new
+            else:
+                files[file] = {"hash": file_hash, "chunks": ids}
+
+    for batch in _embed_and_write(vector_db, _batches(new_chunks(), EMBED_BATCH_SIZE)):
+        chunks_written += len(batch)
+        completed = False
+        for file, count in itertools.groupby(file for file, _, _ in batch):
+            entry, left = unwritten[file]
+            left -= sum(1 for _ in count)
+            if left:
+                unwritten[file] = (entry, left)
+            else:
+                del unwritten[file]
+                files[file] = entry
+                completed = True
+        if completed:
+            save_manifest(manifest)
+
+    if changed:
+        vector_db.persist()
+        save_manifest(manifest)
+    if outdated:
+        print(
+            f"Ingested {len(outdated)} PDFs ({chunks_written} new chunks) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
 
-    return vector_db
\ No newline at end of file
+    return vector_db
@@ -145,4 +145,15 @@ COLUMNS_DESCRIPTIONS = {
     "asal_sekolah_naungan": "Naungan sekolah asal anggota (contoh: Dinas Pendidikan Kab. Ponorogo)",
     "status_sertifikasi": "Status sertifikasi anggota (contoh: Sudah, Belum)",
     "status_nuptk": "Status Nuptk anggota (contoh: Sudah, Belum)"
+}
+
+# Opening questions matching exactly one team's patterns skip the LLM supervisor.
+ROUTING_KEYWORDS = {
+    "Data Team": [
+        r"\b(berapa|jumlah|daftar|siapa)\b.*\banggota\b",
+        r"\bketua komunitas\b",
+    ],
+    "Summary Team": [
+        r"\b(buat|berikan) (kesimpulan|ringkasan|rangkuman)\b",
+    ],
 }
\ No newline at end of file
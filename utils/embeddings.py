@@ -0,0 +1,179 @@
+import os
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from utils.lazy import lazy
+from utils.paths import cache_path, ensure_parent
+
+# SQLite file every embedding is kept in across restarts; empty keeps them in memory only.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", cache_path("embedding_cache.sqlite"))
+# Vectors kept in memory in front of the file (about 6KB each for 1536 dimensions).
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 5000))
+# Texts per call to the wrapped model.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+# SQLite's limit on bound parameters is 999 on older builds.
+_SQL_IN_CHUNK = 500
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings with a persistent cache keyed by model, kind (query or document) and text hash.
+
+    Lookups go through an in-memory LRU, then the SQLite file; only texts
+    found in neither are sent to the wrapped model, deduplicated and in
+    batches of `batch_size`. A text already being embedded by another
+    thread is waited for rather than embedded again, so every embedding is
+    paid for once. Other attributes (e.g. `model`) are the wrapped model's.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.model_key = f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(ensure_parent(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__dict__["embeddings"], name)
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_key}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        with self._db_lock:
+            for i in range(0, len(keys), _SQL_IN_CHUNK):
+                chunk = keys[i:i + _SQL_IN_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def _write(self, vectors: Dict[str, np.ndarray]):
+        if self._db is None or not vectors:
+            return
+        with self._db_lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()],
+            )
+
+    def _compute(self, kind: str, texts: List[str]) -> List[List[float]]:
+        if kind == "query":
+            return [self.embeddings.embed_query(text) for text in texts]
+        return self.embeddings.embed_documents(texts)
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        waiting: Dict[str, Future] = {}
+        todo: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in waiting or key in todo:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                    self.coalesced += 1
+                else:
+                    todo[key] = text
+                    self._inflight[key] = Future()
+
+        try:
+            stored = self._read(list(todo))
+            computed: Dict[str, np.ndarray] = {}
+            missing = [key for key in todo if key not in stored]
+            for i in range(0, len(missing), self.batch_size):
+                batch = missing[i:i + self.batch_size]
+                vectors = self._compute(kind, [todo[key] for key in batch])
+                computed.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(batch, vectors))
+            self._write(computed)
+        except BaseException as e:
+            with self._lock:
+                futures = [self._inflight.pop(key) for key in todo]
+            for future in futures:
+                future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.disk_hits += len(stored)
+            self.misses += len(computed)
+            for key, vector in {**stored, **computed}.items():
+                self._remember(key, vector)
+                found[key] = vector
+                self._inflight.pop(key).set_result(vector)
+        for key, future in waiting.items():
+            found[key] = future.result()
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses + self.coalesced
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+_embeddings = lazy("embeddings", lambda: CachedEmbeddings(OpenAIEmbeddings()))
+
+def get_embeddings() -> CachedEmbeddings:
+    """The embedding model shared by the example selector, the vector store and the answer cache."""
+    return _embeddings.get()
+
+def set_embeddings(embeddings: Embeddings):
+    """Replaces the shared embedding model, e.g. with a local stub for benchmarks; it is cached the same way."""
+    _embeddings.factory = lambda: CachedEmbeddings(embeddings)
+    _embeddings.reset()
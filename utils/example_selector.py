@@ -0,0 +1,123 @@
+import os
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.example_selectors.base import BaseExampleSelector
+from utils.paths import cache_path
+
+EXAMPLE_INDEX_PATH = os.getenv("EXAMPLE_INDEX_PATH", cache_path("example_index"))
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+class PersistentExampleSelector(BaseExampleSelector):
+    """
+    Semantic similarity example selector backed by an on-disk NumPy index.
+
+    Example vectors are stored per embedding model and keyed by the hash of the
+    example text, so an unchanged example set loads without any embedding call
+    and adding examples only embeds the new ones. Selection is a local cosine
+    top-k over the loaded matrix; only the incoming question is embedded.
+    """
+
+    def __init__(
+        self,
+        examples: List[Dict[str, str]],
+        embeddings: Embeddings,
+        k: int = 4,
+        input_keys: Optional[Sequence[str]] = None,
+        path: str = EXAMPLE_INDEX_PATH,
+        model_name: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.k = k
+        self.input_keys = list(input_keys) if input_keys else None
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.index_path = os.path.join(path, _hash(self.model_name)[:16] + ".npz")
+        self._keys: List[str] = []
+        self._index = ([], np.zeros((0, 0), dtype=np.float32))
+        self._lock = threading.Lock()
+        self._load_or_build(list(examples))
+
+    @property
+    def examples(self) -> List[Dict[str, str]]:
+        return self._index[0]
+
+    @property
+    def _matrix(self) -> np.ndarray:
+        return self._index[1]
+
+    def _example_to_text(self, example: Dict[str, str]) -> str:
+        keys = self.input_keys or example.keys()
+        return " ".join(example[key] for key in sorted(keys))
+
+    def _index_key(self) -> str:
+        return _hash(self.model_name, *self._keys)
+
+    def _read_index(self) -> Dict[str, np.ndarray]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with np.load(self.index_path, allow_pickle=False) as data:
+            return {"index_key": str(data["index_key"]), "keys": list(data["keys"]), "vectors": data["vectors"]}
+
+    def _write_index(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            index_key=np.array(self._index_key()),
+            keys=np.array(self._keys),
+            vectors=self._matrix,
+        )
+        os.replace(tmp_path, self.index_path)
+
+    def _load_or_build(self, examples: List[Dict[str, str]]):
+        texts = [self._example_to_text(example) for example in examples]
+        self._keys = [_hash(text) for text in texts]
+        stored = self._read_index()
+        if stored and stored["index_key"] == self._index_key():
+            self._index = (examples, stored["vectors"])
+            return
+
+        # Reuse every vector we already have, embed only the examples that are new.
+        known = dict(zip(stored.get("keys", []), stored.get("vectors", [])))
+        missing = [i for i, key in enumerate(self._keys) if key not in known]
+        if missing:
+            vectors = self._normalize(self.embeddings.embed_documents([texts[i] for i in missing]))
+            known.update((self._keys[i], vector) for i, vector in zip(missing, vectors))
+        self._index = (examples, np.array([known[key] for key in self._keys], dtype=np.float32))
+        self._write_index()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add_example(self, example: Dict[str, str]) -> str:
+        """Adds an example, embedding only that example, and persists the index."""
+        text = self._example_to_text(example)
+        vector = self._normalize(self.embeddings.embed_documents([text]))
+        with self._lock:
+            # Swap examples and vectors in one assignment so concurrent selects see a consistent pair.
+            matrix = vector if not len(self.examples) else np.vstack([self._matrix, vector])
+            self._keys = self._keys + [_hash(text)]
+            self._index = (self.examples + [example], matrix)
+            self._write_index()
+        return self._keys[-1]
+
+    def select_examples(self, input_variables: Dict[str, str]) -> List[dict]:
+        """Selects the k examples most similar to the input by cosine similarity."""
+        examples, matrix = self._index
+        if not examples:
+            return []
+        query = self._normalize(self.embeddings.embed_query(self._example_to_text(input_variables)))[0]
+        scores = matrix @ query
+        k = min(self.k, len(examples))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [examples[i] for i in top]
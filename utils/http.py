@@ -0,0 +1,33 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.lazy import lazy
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 15))
+# Only failed connects are retried; a request that reached the API is never sent twice.
+HTTP_CONNECT_RETRIES = 2
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(total=None, connect=HTTP_CONNECT_RETRIES, read=0, status=0, backoff_factor=0.2),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_session = lazy("http_session", _build_session)
+
+def get_session() -> requests.Session:
+    """
+    The HTTP session shared by every tool that calls an external API.
+
+    Its connection pool is thread-safe and outlives any one event loop, so
+    async callers use it through asyncio.to_thread rather than opening an
+    aiohttp session per call.
+    """
+    return _session.get()
@@ -0,0 +1,74 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+class LazyComponent:
+    """A component that is built on first use and remembers how long the build took."""
+
+    def __init__(self, name: str, factory: Callable):
+        self.name = name
+        self.factory = factory
+        self.build_time: Optional[float] = None
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def get(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    start = time.perf_counter()
+                    self._value = self.factory()
+                    self.build_time = time.perf_counter() - start
+                    self._built = True
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._built = False
+            self.build_time = None
+
+_components: Dict[str, LazyComponent] = {}
+_components_lock = threading.Lock()
+
+def lazy(name: str, factory: Callable) -> LazyComponent:
+    """Registers a lazily built component under `name`, replacing any previous one."""
+    component = LazyComponent(name, factory)
+    with _components_lock:
+        _components[name] = component
+    return component
+
+def get_component(name: str) -> LazyComponent:
+    return _components[name]
+
+def registered_components() -> list:
+    return list(_components)
+
+def warm_up(names: Optional[Iterable[str]] = None, max_workers: int = 4) -> Dict[str, float]:
+    """
+    Builds the given components (all registered ones by default) in parallel.
+
+    Args:
+        names: The component names to build.
+        max_workers: The size of the thread pool used for building.
+
+    Returns:
+        A dict mapping each component name to its build time in seconds.
+        Components that were already built report their original build time.
+    """
+    names = list(names) if names is not None else registered_components()
+    components = [_components[name] for name in names]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up") as pool:
+        for future in [pool.submit(component.get) for component in components]:
+            future.result()
+    return {component.name: component.build_time for component in components}
+
+def startup_timings() -> Dict[str, float]:
+    """Build times of every component that has been built so far."""
+    return {name: c.build_time for name, c in _components.items() if c.built}
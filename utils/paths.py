@@ -0,0 +1,17 @@
+import os
+
+# Directory of the files the app rebuilds on its own: embedding cache, SQLite
+# checkpoints, few-shot example index and vector store. Each has its own *_PATH
+# override as well.
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+def cache_path(name: str) -> str:
+    """The default location of `name` under CACHE_DIR."""
+    return os.path.join(CACHE_DIR, name)
+
+def ensure_parent(path: str) -> str:
+    """Creates the directory `path` is in, if missing; returns `path`."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return path
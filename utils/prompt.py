@@ -1,6 +1,3 @@
-from langchain_community.vectorstores import FAISS
-from langchain_core.example_selectors import SemanticSimilarityExampleSelector
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.prompts import (
     ChatPromptTemplate,
     FewShotPromptTemplate,
@@ -9,6 +6,9 @@ from langchain_core.prompts import (
     SystemMessagePromptTemplate,
 )
 from utils.constants import prompt
+from utils.lazy import lazy
+from utils.embeddings import get_embeddings
+from utils.example_selector import PersistentExampleSelector
 
 SQL_PROMPT="""
 ### Task
@@ -83,15 +83,36 @@ Given the following user request, respond with the worker to act next. Each work
 If the question is related to a person's komunitas anggota data, you should route to the worker that processes with the database as the first choice.
 When finished, respond with FINISH.
 """
-prompt_selector = SemanticSimilarityExampleSelector.from_examples(
+FAST_SQL_PROMPT = """You are a {dialect} expert. Given an input question in Indonesian language, write ONE syntactically correct {dialect} SELECT query that answers it.
+Unless the user specifies a specific number of examples they wish to obtain, always limit your query to at most {top_k} results.
+Never query for all the columns from a specific table, only ask for the relevant columns given the question.
+DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the database.
+Return only the SQL query, without explanation or code fences. If the question cannot be answered from these tables, return "I do not know".
+
+Only use the following tables:
+{table_info}
+
+Here are some examples of user inputs and their corresponding SQL queries:
+"""
+
+SQL_REPAIR_PROMPT = """The query failed: {error}
+Return only the corrected SQL query."""
+
+def _build_example_selector() -> PersistentExampleSelector:
+    # Loads the persisted example vectors; only new or changed examples are embedded.
+    return PersistentExampleSelector(
         prompt,
-        OpenAIEmbeddings(),
-        FAISS,
+        get_embeddings(),
         k=5,
         input_keys=["question"],
     )
 
-few_shot_prompt = FewShotPromptTemplate(
+_example_selector = lazy("sql_examples", _build_example_selector)
+
+def _build_full_prompt() -> ChatPromptTemplate:
+    prompt_selector = _example_selector.get()
+
+    few_shot_prompt = FewShotPromptTemplate(
         example_selector=prompt_selector,
         example_prompt=PromptTemplate.from_template(
             "User input: {question}\nSQL query: {query}"
@@ -100,12 +121,42 @@ few_shot_prompt = FewShotPromptTemplate(
         prefix=POSTGRES_PROMPT,
         suffix="",
     )
-    
-full_prompt = ChatPromptTemplate.from_messages(
+
+    return ChatPromptTemplate.from_messages(
         [
             # MessagesPlaceholder(variable_name="history"),
             SystemMessagePromptTemplate(prompt=few_shot_prompt),
             ("human", "{question}"),
             MessagesPlaceholder("agent_scratchpad"),
         ]
-    )
\ No newline at end of file
+    )
+
+def _build_fast_sql_prompt() -> ChatPromptTemplate:
+    few_shot_prompt = FewShotPromptTemplate(
+        example_selector=_example_selector.get(),
+        example_prompt=PromptTemplate.from_template(
+            "User input: {question}\nSQL query: {query}"
+        ),
+        input_variables=["question", "dialect", "top_k", "table_info"],
+        prefix=FAST_SQL_PROMPT,
+        suffix="",
+    )
+
+    return ChatPromptTemplate.from_messages(
+        [
+            SystemMessagePromptTemplate(prompt=few_shot_prompt),
+            ("human", "{question}"),
+            MessagesPlaceholder("repair", optional=True),
+        ]
+    )
+
+_full_prompt = lazy("few_shot_prompt", _build_full_prompt)
+_fast_sql_prompt = lazy("fast_sql_prompt", _build_fast_sql_prompt)
+
+def get_full_prompt() -> ChatPromptTemplate:
+    """The few-shot SQL agent prompt; the example index is embedded on first use."""
+    return _full_prompt.get()
+
+def get_fast_sql_prompt() -> ChatPromptTemplate:
+    """The single-shot SQL generation prompt, with the same few-shot examples as the agent."""
+    return _fast_sql_prompt.get()
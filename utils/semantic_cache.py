@@ -0,0 +1,153 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_VERSION_CHECK_INTERVAL = 30
+
+# Numbers, quoted strings and capitalised names: questions differing in these
+# ("tahun 2023" vs "tahun 2022") embed almost identically but have other answers.
+_SPECIFIC_TOKENS = re.compile(r"\d+(?:[.,]\d+)*|\"[^\"]*\"|'[^']*'|\b[A-Z][\w-]*")
+# Stands for a version probe that failed; never equal to a real version.
+_PROBE_FAILED = object()
+
+def specific_tokens(question: str) -> tuple:
+    """The tokens of a question that must match exactly for a cached answer to apply."""
+    tokens = _SPECIFIC_TOKENS.findall(question.strip())
+    # The first word is capitalised as the start of the sentence, not as a name.
+    if tokens and tokens[0][0].isalpha() and question.strip().startswith(tokens[0]):
+        tokens = tokens[1:]
+    return tuple(sorted(tokens))
+
+class SemanticCache:
+    """
+    Answers keyed by question embedding, looked up by cosine similarity.
+
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted beyond `max_entries`. When a `version` callable is given (e.g. a
+    fingerprint of the table and document set), the cache is cleared as soon as
+    the version it returns changes; while it cannot be determined, every
+    lookup misses. A similar question only hits when its numbers, quoted
+    strings and names (specific_tokens) are the same.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        version: Optional[Callable[[], str]] = None,
+        version_check_interval: float = SEMANTIC_CACHE_VERSION_CHECK_INTERVAL,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.mismatches = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: list = []
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _probe_version(self, now: float):
+        """Calls `version` at most every interval, outside the lock (it may query the database)."""
+        if self.version is None or now - self._checked_at < self.version_check_interval:
+            return None
+        self._checked_at = now
+        try:
+            return self.version()
+        except Exception:
+            return _PROBE_FAILED
+
+    def _apply_version(self, version):
+        # Call with self._lock held; a failed probe also clears, as the data may have changed.
+        if version is not None and (version is _PROBE_FAILED or version != self._version):
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._ids = list(self._entries)
+            vectors = [self._entries[i][1] for i in self._ids]
+            self._matrix = np.vstack(vectors) if vectors else None
+        return self._matrix
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Returns the cached answer of the most similar fresh question, if similar enough."""
+        vector = self._embed(question)
+        tokens = specific_tokens(question)
+        now = time.monotonic()
+        version = self._probe_version(now)
+        with self._lock:
+            self._apply_version(version)
+            matrix = self._get_matrix() if self._version is not _PROBE_FAILED else None
+            if matrix is not None:
+                scores = matrix @ vector
+                for index in np.argsort(-scores):
+                    if scores[index] < self.threshold:
+                        break
+                    entry_id = self._ids[index]
+                    entry = self._entries.get(entry_id)
+                    if entry is None:
+                        continue
+                    if now - entry[3] > self.ttl:
+                        del self._entries[entry_id]
+                        self._matrix = None
+                        continue
+                    if entry[4] != tokens:
+                        self.mismatches += 1
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return entry[2]
+            self.misses += 1
+            return None
+
+    def store(self, question: str, answer: str):
+        vector = self._embed(question)
+        version = self._probe_version(time.monotonic())
+        with self._lock:
+            self._apply_version(version)
+            if self._version is _PROBE_FAILED:
+                return
+            self._entries[self._next_id] = (question, vector, answer, time.monotonic(), specific_tokens(question))
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "mismatches": self.mismatches,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }